@@ -39,9 +39,11 @@ def demo_core_concepts():
     
     # 通过工具接口添加消息
     cm = context_tool.context_manager
+    lines = []
     for msg_dict in test_messages:
         cm.add_message_dict(msg_dict)
-        print(f"  [{msg_dict['role']}] {msg_dict['content']}")
+        lines.append(f"  [{msg_dict['role']}] {msg_dict['content']}")
+    print("\n".join(lines))
     
     # 监控上下文状态
     monitor_result = context_tool.execute("monitor")
@@ -64,9 +66,11 @@ def demo_core_concepts():
         {"role": "assistant", "content": "认证模块重构完毕，主要改进：增加了JWT支持"},
     ]
     
+    lines = []
     for msg_dict in conversation:
         cm.add_message_dict(msg_dict)
-        print(f"  [{msg_dict['role']}] {msg_dict['content']}")
+        lines.append(f"  [{msg_dict['role']}] {msg_dict['content']}")
+    print("\n".join(lines))
     
     # 获取详细统计
     stats_result = context_tool.execute("stats")
@@ -93,6 +97,7 @@ def demo_core_concepts():
     
     # 演示各种工具操作
     actions = [
+        ("summarize", "分层压缩早期消息", {}),
         ("recent", "获取最近消息", {"limit": 3}),
         ("monitor", "监控上下文状态", {}),
         ("stats", "获取完整统计", {}),
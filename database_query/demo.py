@@ -28,6 +28,9 @@ DATABASE_PROMPT = f"""你是一个数据库查询专家。
 - 如果结果为空，说"没有找到相关数据"
 - 不要显示 SQL 代码"""
 
+# 固定的系统消息前缀，所有问题共用同一对象，便于服务端前缀缓存
+_SYSTEM_MSG = ({"role": "system", "content": DATABASE_PROMPT},)
+
 
 def create_database():
     """创建示例数据库"""
@@ -63,17 +66,20 @@ def demo_direct_sql():
         """)
     ]
     
+    # 输出先收集到列表，全部查询完成后一次写出
+    lines = []
     for desc, sql in queries:
-        print(f"\n{desc}")
-        print(f"SQL: {sql.strip()}")
+        lines.append(f"\n{desc}")
+        lines.append(f"SQL: {sql.strip()}")
         result = tool.execute(sql.strip())
         if result["success"]:
             data = result["data"]
-            print(f"返回 {data['row_count']} 条记录")
+            lines.append(f"返回 {data['row_count']} 条记录")
             for row in data["results"][:3]:
-                print(f"  {row}")
+                lines.append(f"  {row}")
         else:
-            print(f"错误: {result['error']}")
+            lines.append(f"错误: {result['error']}")
+    print("\n".join(lines))
 
 
 def demo_with_llm():
@@ -100,10 +106,7 @@ def demo_with_llm():
         print(f"\n问题: {question}")
         print("-" * 40)
         
-        messages = [
-            {"role": "system", "content": DATABASE_PROMPT},
-            {"role": "user", "content": question}
-        ]
+        messages = [*_SYSTEM_MSG, {"role": "user", "content": question}]
         
         result = client.chat(messages, max_turns=3)
         
@@ -134,10 +137,7 @@ def demo_interactive():
         if not question:
             continue
         
-        messages = [
-            {"role": "system", "content": DATABASE_PROMPT},
-            {"role": "user", "content": question}
-        ]
+        messages = [*_SYSTEM_MSG, {"role": "user", "content": question}]
         
         result = client.chat(messages, max_turns=3)
         
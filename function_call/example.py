@@ -17,34 +17,46 @@ def demo_basic_tools():
     
     # 导入工具
     from tools import get_tool_by_name
+    from concurrent.futures import ThreadPoolExecutor
+    
+    # 三个工具调用互不依赖，并发执行后按固定顺序输出
+    calls = [
+        ("get_weather", ("北京",)),
+        ("calculate", ("(123 + 456) * 789",)),
+        ("get_current_time", ()),
+    ]
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        futures = [
+            executor.submit(get_tool_by_name(name).execute, *args)
+            for name, args in calls
+        ]
+    weather_result, calc_result, time_result = [future.result() for future in futures]
+    
+    lines = []
     
     # 1. 天气工具
-    print("\n🌤️  天气查询:")
-    weather_tool = get_tool_by_name("get_weather")
-    result = weather_tool.execute("北京")
-    if result["success"]:
-        data = result["data"]
-        print(f"  城市: {data['location']}")
-        print(f"  温度: {data['temperature']}°C")
-        print(f"  天气: {data['condition']}")
+    lines.append("\n🌤️  天气查询:")
+    if weather_result["success"]:
+        data = weather_result["data"]
+        lines.append(f"  城市: {data['location']}")
+        lines.append(f"  温度: {data['temperature']}°C")
+        lines.append(f"  天气: {data['condition']}")
     
     # 2. 计算器工具
-    print("\n🧮 数学计算:")
-    calc_tool = get_tool_by_name("calculate")
-    result = calc_tool.execute("(123 + 456) * 789")
-    if result["success"]:
-        data = result["data"]
-        print(f"  表达式: {data['expression']}")
-        print(f"  结果: {data['result']}")
+    lines.append("\n🧮 数学计算:")
+    if calc_result["success"]:
+        data = calc_result["data"]
+        lines.append(f"  表达式: {data['expression']}")
+        lines.append(f"  结果: {data['result']}")
     
     # 3. 时间工具
-    print("\n⏰ 时间查询:")
-    time_tool = get_tool_by_name("get_current_time")
-    result = time_tool.execute()
-    if result["success"]:
-        data = result["data"]
-        print(f"  当前时间: {data['datetime']}")
-        print(f"  星期: {data['weekday']}")
+    lines.append("\n⏰ 时间查询:")
+    if time_result["success"]:
+        data = time_result["data"]
+        lines.append(f"  当前时间: {data['datetime']}")
+        lines.append(f"  星期: {data['weekday']}")
+    
+    print("\n".join(lines))
 
 def demo_tool_registration():
     """演示工具注册机制"""
@@ -5,25 +5,55 @@ LLM客户端封装
 
 import os
 import json
+import time
 import logging
-from typing import List, Dict, Any, Optional
+import functools
+from collections import deque
+from itertools import islice
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from openai import OpenAI
 from dotenv import load_dotenv
 
-# 确保能够导入项目模块
-import sys
-import os as os_path
-project_root = os_path.path.dirname(os_path.path.dirname(os_path.path.abspath(__file__)))
-if project_root not in sys.path:
-    sys.path.insert(0, project_root)
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时使用标准库 json
+    orjson = None
 
 from tools import get_all_tools, get_tool_by_name
-from utils.validators import validate_tool_call
+from utils.validators import ErrCode, validate_tool_call
 from utils.rate_limiter import RateLimiter
+from .response_cache import ResponseCache
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _json_dumps(obj: Any) -> str:
+    """序列化工具结果（优先使用 orjson，超出其支持范围时回退标准库）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            # 如超过 64 位的整数等 orjson 不支持的值
+            pass
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _json_loads(text: str) -> Any:
+    """解析工具调用参数"""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_openai(api_key: Optional[str], base_url: str) -> OpenAI:
+    """按 (api_key, base_url) 复用 OpenAI 客户端，共享底层连接池"""
+    return OpenAI(api_key=api_key, base_url=base_url)
+
 class LLMClient:
     """LLM客户端"""
     
@@ -41,15 +71,25 @@ class LLMClient:
                 format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             )
         
-        self.client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+        self.client = _get_openai(
+            os.getenv("OPENAI_API_KEY"),
+            os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
         )
-        self.tools = get_all_tools()
         self.rate_limiter = RateLimiter(
             limit_per_minute=int(os.getenv("RATE_LIMIT_PER_MINUTE", 60))
         )
         self.max_retries = int(os.getenv("MAX_RETRIES", 3))
+        
+        # 相同请求重复运行时回放结果（LLM_CACHE_DISABLE=1 关闭）
+        self.response_cache = ResponseCache(
+            cache_dir=os.getenv("LLM_CACHE_DIR", os.path.join(project_root, ".cache", "llm")),
+            enabled=os.getenv("LLM_CACHE_DISABLE", "0") != "1"
+        )
+    
+    @property
+    def tools(self) -> List[Dict[str, Any]]:
+        """启用工具的定义（tools 模块内缓存，注册表变化后自动重建）"""
+        return get_all_tools()
     
     def chat(self, messages: List[Dict[str, Any]], 
              tool_choice: str = "auto",
@@ -65,58 +105,78 @@ class LLMClient:
         Returns:
             最终响应
         """
-        current_messages = messages.copy()
+        # 工具定义也参与缓存键：启用的工具变化后不再回放调用旧工具的结果
+        tools = self.tools if tool_choice != "none" else None
+        cache_key = self.response_cache.make_key("chat", self.model, tool_choice, max_turns, tools, messages)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        started = time.monotonic()
+        result = self._chat(messages, tool_choice, max_turns)
+        # 只缓存模型真正生成的回答；降级的兜底回复不写入，避免后续运行反复回放
+        if result["success"] and not result.get("degraded"):
+            self.response_cache.put(cache_key, result, time.monotonic() - started)
+        return result
+    
+    def _chat(self, messages: List[Dict[str, Any]], tool_choice: str,
+              max_turns: int) -> Dict[str, Any]:
+        """执行对话（不经过响应缓存）"""
+        # 开头的系统消息固定保留，其余历史放入定长环形缓冲区，超出窗口时自动淘汰最旧消息；
+        # 缓冲区比历史上限多留 4 条余量，容纳一轮中的助手消息和工具结果
+        pinned_count = 0
+        while pinned_count < len(messages) and messages[pinned_count].get("role") == "system":
+            pinned_count += 1
+        pinned = tuple(messages[:pinned_count])
+        history = deque(messages[pinned_count:], maxlen=self.max_conversation_history + 4)
+        # 当前用户问题：即使被缓冲区淘汰，发送时也要保留
+        anchor = next((msg for msg in reversed(messages) if msg.get("role") == "user"), None)
         
         # 直接使用tools参数，让LLM自主判断是否需要调用工具
         
         for turn in range(max_turns):
-            logger.info(f"对话轮次：{turn + 1}")
+            logger.info("对话轮次：%d", turn + 1)
             
             try:
                 # 速率限制检查
                 self.rate_limiter.acquire()
                 
-                # 调用API
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=current_messages,
-                    tools=self.tools,
-                    tool_choice=tool_choice,
-                    temperature=0.7,
-                )
-                
-                assistant_message = response.choices[0].message
-                current_messages.append(assistant_message)
-                
-                # 检查是否有工具调用
-                if not assistant_message.tool_calls:
-                    # 没有工具调用，返回最终回答
-                    return {
-                        "success": True,
-                        "content": assistant_message.content,
-                        "tool_calls_count": turn + 1,
-                        "messages": current_messages
-                    }
-                
-                # 处理工具调用
-                for tool_call in assistant_message.tool_calls:
-                    result = self._execute_tool_call(tool_call)
+                # 流式调用API，工具调用参数接收完整后立即提交执行
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    assistant_message, pending = self._stream_turn(
+                        self._window(pinned, history, anchor), tool_choice, executor
+                    )
+                    history.append(assistant_message)
                     
-                    # 添加工具响应到消息历史
-                    current_messages.append({
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": json.dumps(result, ensure_ascii=False)
-                    })
+                    # 检查是否有工具调用
+                    if not pending:
+                        # 没有工具调用，返回最终回答
+                        return {
+                            "success": True,
+                            "content": assistant_message["content"],
+                            "tool_calls_count": turn + 1,
+                            "messages": self._window(pinned, history, anchor)
+                        }
                     
-                    logger.info(f"工具调用完成：{tool_call.function.name}")
+                    # 按原顺序写回工具结果
+                    for tool_call, future in pending:
+                        result = future.result()
+                        
+                        # 添加工具响应到消息历史
+                        history.append({
+                            "role": "tool",
+                            "tool_call_id": tool_call["id"],
+                            "content": _json_dumps(result)
+                        })
+                        
+                        logger.info("工具调用完成：%s", tool_call["function"]["name"])
                 
             except Exception as e:
                 logger.error(f"对话失败：{str(e)}")
                 return {
                     "success": False,
                     "error": str(e),
-                    "messages": current_messages
+                    "messages": self._window(pinned, history, anchor)
                 }
         
         # 达到最大轮数，调用 LLM 生成最终答案
@@ -125,7 +185,7 @@ class LLMClient:
             self.rate_limiter.acquire()
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=current_messages,
+                messages=self._window(pinned, history, anchor),
                 temperature=0.7,
             )
             final_answer = response.choices[0].message.content
@@ -133,27 +193,124 @@ class LLMClient:
                 "success": True,
                 "content": final_answer,
                 "tool_calls_count": max_turns,
-                "messages": current_messages
+                "messages": self._window(pinned, history, anchor)
             }
         except Exception as e:
+            logger.error("生成最终答案失败：%s", e)
             return {
                 "success": True,
+                "degraded": True,
                 "content": "抱歉，处理过程过于复杂，未能完成所有操作。",
                 "tool_calls_count": max_turns,
-                "messages": current_messages
+                "messages": self._window(pinned, history, anchor)
             }
     
-    def _execute_tool_call(self, tool_call) -> Dict[str, Any]:
+    def _window(self, pinned: tuple, history: deque,
+                anchor: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        拼接发送给模型的消息：固定前缀 + 当前用户问题 + 历史窗口
+        
+        窗口开头失去对应调用的工具结果会被跳过；当前用户问题已被淘汰出窗口时
+        放在固定前缀之后，保证模型始终能看到问题。
+        """
+        start = 0
+        while start < len(history) and history[start].get("role") == "tool":
+            start += 1
+        window = list(islice(history, start, None))
+        if anchor is not None and not any(msg is anchor for msg in window):
+            return [*pinned, anchor, *window]
+        return [*pinned, *window]
+    
+    def _stream_turn(self, messages: List[Dict[str, Any]], tool_choice: str,
+                     executor: ThreadPoolExecutor) -> Tuple[Dict[str, Any], List[Tuple[Dict[str, Any], Future]]]:
+        """
+        流式执行一轮对话
+        
+        工具调用按 index 依次出现，下一个调用开始时上一个调用的参数已经完整，
+        此时即提交到线程池执行，与模型后续输出重叠。
+        
+        Returns:
+            (助手消息, [(工具调用, 执行结果 Future), ...])
+        """
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "stream": True,
+        }
+        # 不允许调用工具时不上传工具定义，减少请求体积
+        if tool_choice != "none":
+            request["tools"] = self.tools
+            request["tool_choice"] = tool_choice
+        stream = self.client.chat.completions.create(**request)
+        
+        # 增量片段先收集到列表，结束时一次拼接，避免逐块字符串拼接的重复分配
+        content_parts = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        argument_parts: Dict[int, List[str]] = {}
+        pending = []
+        submitted = set()
+        
+        def submit_ready(before_index: Optional[int] = None):
+            for index in sorted(tool_calls):
+                if before_index is not None and index >= before_index:
+                    break
+                if index not in submitted:
+                    submitted.add(index)
+                    tool_call = tool_calls[index]
+                    tool_call["function"]["arguments"] = "".join(argument_parts[index])
+                    future = executor.submit(
+                        self._execute_tool_call,
+                        tool_call["function"]["name"],
+                        tool_call["function"]["arguments"],
+                    )
+                    pending.append((tool_call, future))
+        
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content_parts.append(delta.content)
+            for tc_delta in delta.tool_calls or []:
+                if tc_delta.index not in tool_calls:
+                    submit_ready(before_index=tc_delta.index)
+                    tool_calls[tc_delta.index] = {
+                        "id": "",
+                        "type": "function",
+                        "function": {"name": "", "arguments": ""}
+                    }
+                    argument_parts[tc_delta.index] = []
+                entry = tool_calls[tc_delta.index]
+                if tc_delta.id:
+                    entry["id"] = tc_delta.id
+                if tc_delta.function:
+                    if tc_delta.function.name:
+                        entry["function"]["name"] += tc_delta.function.name
+                    if tc_delta.function.arguments:
+                        argument_parts[tc_delta.index].append(tc_delta.function.arguments)
+        
+        submit_ready()
+        
+        assistant_message = {"role": "assistant", "content": "".join(content_parts) or None}
+        if pending:
+            assistant_message["tool_calls"] = [tool_call for tool_call, _ in pending]
+        return assistant_message, pending
+    
+    def _execute_tool_call(self, function_name: str, arguments: str) -> Dict[str, Any]:
         """执行单个工具调用"""
-        function_name = tool_call.function.name
-        function_args = json.loads(tool_call.function.arguments)
+        function_args = _json_loads(arguments)
         
         # 安全验证
         validation_result = validate_tool_call(function_name, function_args)
         if not validation_result["valid"]:
+            error = validation_result["error"]
+            if validation_result.get("code") is ErrCode.UNAUTHORIZED:
+                # 共享的未授权结果不含函数名，返回给模型前补上
+                error = f"{error}：{function_name}"
             return {
                 "success": False,
-                "error": validation_result["error"]
+                "error": error
             }
         
         # 获取工具实例
@@ -194,14 +351,22 @@ class LLMClient:
         
         messages.append({"role": "user", "content": user_message})
         
+        cache_key = self.response_cache.make_key("chat_simple", self.model, messages)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
+            started = time.monotonic()
             response = self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=0.7,
             )
             
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            self.response_cache.put(cache_key, content, time.monotonic() - started)
+            return content
             
         except Exception as e:
             logger.error(f"聊天失败: {str(e)}")
@@ -209,6 +374,7 @@ class LLMClient:
 
 # 使用示例
 if __name__ == "__main__":
+    # 使用相对导入，需在项目根目录以模块方式运行：python -m llm.client
     client = LLMClient()
     
     # 简单对话
@@ -0,0 +1,101 @@
+"""
+LLM 响应缓存
+基于文件系统的 LRU 缓存，相同请求重复运行时直接回放结果
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """文件系统 LRU 响应缓存"""
+
+    def __init__(self, cache_dir: str, max_entries: int = 256,
+                 min_duration: float = 0.5, enabled: bool = True):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_entries: 最多保留的条目数，超出时淘汰最久未使用的
+            min_duration: 只缓存耗时不少于该秒数的调用
+            enabled: 是否启用缓存
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.min_duration = min_duration
+        self.enabled = enabled
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """根据请求内容生成缓存键"""
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，未命中返回 None"""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # 更新修改时间，作为 LRU 的最近使用时间
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        logger.info("命中 LLM 响应缓存: %s", key)
+        return value
+
+    def put(self, key: str, value: Any, duration: float) -> None:
+        """写入缓存"""
+        if not self.enabled or duration < self.min_duration:
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+            self._evict()
+        except OSError as e:
+            logger.warning("写入 LLM 响应缓存失败: %s", e)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的条目"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                entries.append((entry.stat().st_mtime, entry.path))
+
+        overflow = len(entries) - self.max_entries
+        if overflow <= 0:
+            return
+
+        entries.sort()
+        for _, path in entries[:overflow]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    cache = ResponseCache(os.path.join("/tmp", "agent-learn-cache-demo"), max_entries=2, min_duration=0)
+    key = cache.make_key("gpt-4-turbo", [{"role": "user", "content": "你好"}])
+    print(f"写入前: {cache.get(key)}")
+    cache.put(key, {"content": "你好！"}, duration=1.0)
+    print(f"写入后: {cache.get(key)}")
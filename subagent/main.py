@@ -12,11 +12,20 @@ if project_root not in sys.path:
 
 from llm.client import LLMClient
 from utils.logger import setup_logging
+from utils.json_extract import extract_json_object
 
 
 load_dotenv()
 logger = setup_logging(log_level="INFO", log_file="subagent")
 
+_FUSED_PROMPT = (
+    "你同时扮演项目规划子代理和实现子代理。\n"
+    "第一阶段：把高层目标拆成 3-7 个小任务，按顺序列出。\n"
+    "第二阶段：针对第一个任务，给出非常具体的 3-5 步操作清单。\n"
+    "请严格只输出一个 JSON 对象，不要任何解释或额外文本，结构如下：\n"
+    '{"plan": ["任务1", "任务2"], "detailed_first_task": {"task": "任务1", "steps": ["步骤1", "步骤2"]}}'
+)
+
 
 class PlannerSubagent:
     def __init__(self, client: LLMClient):
@@ -72,13 +81,46 @@ def run_main_agent(goal: str) -> None:
     print(detailed_plan)
 
 
+def run_main_agent_fused(goal: str) -> None:
+    """规划与细化合并为一次请求，两个子代理的输出通过 JSON 信封一次返回"""
+    client = LLMClient(model="gpt-4-turbo")
+
+    print("🤖 主代理: 接收到用户目标")
+    print(goal)
+
+    print("\n🧩 子代理(规划 + 实现): 一次请求完成规划与第一个任务的细化...")
+    content = client.chat_simple(
+        user_message=goal,
+        system_prompt=_FUSED_PROMPT,
+    )
+    try:
+        result = extract_json_object(content)
+    except ValueError:
+        print("\n⚠️ 无法从输出中解析 JSON 结果")
+        print(content)
+        return
+
+    plan = result.get("plan") or []
+    for index, task in enumerate(plan, start=1):
+        print(f"{index}. {task}")
+
+    detailed = result.get("detailed_first_task")
+    if not isinstance(detailed, dict) or not detailed.get("steps"):
+        print("\n⚠️ 输出中缺少第一个任务的细化方案")
+        return
+
+    print("\n🛠️ 第一个任务的细化方案:", detailed.get("task") or (plan[0] if plan else ""))
+    for index, step in enumerate(detailed["steps"], start=1):
+        print(f"  {index}. {step}")
+
+
 def main():
     print("🚀 Subagent Demo")
     print("时间:", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
 
     try:
         goal = "在一周内搭建一个可以发布文章的个人技术博客，并支持基本的访问统计。"
-        run_main_agent(goal)
+        run_main_agent_fused(goal)
         print("\n✅ Subagent 演示完成")
         print("主代理只负责拆分角色，具体思考交给子代理完成。")
     except Exception as e:
@@ -4,66 +4,98 @@ Claude Task Planner Demo - 任务规划演示
 展示 Claude 的计划与推理核心能力
 """
 
-import sys
-import os
 import json
+import functools
+import string
+import heapq
+import graphlib
+import itertools
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from enum import Enum
-from dataclasses import dataclass, asdict
+from typing import TYPE_CHECKING, Callable, Iterable, List, Dict, Any, Optional, Set, Tuple
+from enum import IntEnum
+from dataclasses import dataclass, field
 
 from dotenv import load_dotenv
 
-# 添加项目路径
-project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, project_root)
-
-from llm.client import LLMClient
 from utils.logger import setup_logging
+from utils.json_extract import extract_json_object
+from .plan_cache import PlanCache
+from .plan_template_cache import PlanTemplateStore
+
+if TYPE_CHECKING:
+    from llm.client import LLMClient
 
 
 load_dotenv()
 logger = setup_logging(log_level="INFO", log_file="task_planner")
 
 
+_SYSTEM_PROMPT = (
+    "你是一个项目任务规划助手。"
+    "面向第一次接触 AI 代理的开发者，用分步骤的方式规划任务。\n"
+    "请严格只输出一个 JSON 对象，不要任何解释或额外文本。\n"
+    "JSON 结构示例:\n"
+    "{\n"
+    '  "goal_summary": "你理解到的目标摘要",\n'
+    '  "tasks": [\n'
+    '    {\n'
+    '      "id": "task_1",\n'
+    '      "title": "步骤名称",\n'
+    '      "description": "一句话说明",\n'
+    '      "priority": 1,\n'
+    '      "estimated_hours": 2.0\n'
+    "    }\n"
+    "  ],\n"
+    '  "execution_notes": "用一两句话解释推荐的执行顺序"\n'
+    "}"
+)
+
+
 class TaskPlanningAgent:
-    def __init__(self, client: LLMClient):
+    def __init__(self, client: "LLMClient", cache: Optional[PlanCache] = None,
+                 templates: Optional[PlanTemplateStore] = None):
         self.client = client
+        self.cache = cache or PlanCache()
+        self.templates = templates or PlanTemplateStore()
 
     def plan(self, goal: str) -> Dict[str, Any]:
-        system_prompt = (
-            "你是一个项目任务规划助手。"
-            "面向第一次接触 AI 代理的开发者，用分步骤的方式规划任务。\n"
-            "请严格只输出一个 JSON 对象，不要任何解释或额外文本。\n"
-            "JSON 结构示例:\n"
-            "{\n"
-            '  "goal_summary": "你理解到的目标摘要",\n'
-            '  "tasks": [\n'
-            '    {\n'
-            '      "id": "task_1",\n'
-            '      "title": "步骤名称",\n'
-            '      "description": "一句话说明",\n'
-            '      "priority": 1,\n'
-            '      "estimated_hours": 2.0\n'
-            "    }\n"
-            "  ],\n"
-            '  "execution_notes": "用一两句话解释推荐的执行顺序"\n'
-            "}"
-        )
+        # 相同或高度相似的目标直接复用已有规划
+        scope = PlanCache.make_scope(self.client.model, _SYSTEM_PROMPT)
+        cached = self.cache.get(scope, goal)
+        if cached is not None:
+            return cached
+
+        # 有相似目标的规划模板时，只让 LLM 改写模板，提示词和输出都更短
+        template = self.templates.lookup(goal)
+        if template is not None:
+            request_prompt = (
+                "你是一个项目任务规划助手。"
+                "请把下面的任务规划模板调整为适合用户新目标的版本，"
+                "补充 goal_summary 和每个任务的 id，保持相同的 JSON 结构，只输出 JSON：\n"
+                + json.dumps(template, ensure_ascii=False)
+            )
+        else:
+            request_prompt = _SYSTEM_PROMPT
 
         content = self.client.chat_simple(
             user_message=goal,
-            system_prompt=system_prompt,
+            system_prompt=request_prompt,
         )
-        start = content.find("{")
-        end = content.rfind("}")
-        if start == -1 or end == -1:
-            raise ValueError("LLM 输出中未找到 JSON 对象")
-        json_text = content[start : end + 1]
-        return json.loads(json_text)
+        plan = self._extract_json(content)
+        self.cache.put(scope, goal, plan)
+        self.templates.store(goal, plan)
+        return plan
+
+    @staticmethod
+    def _extract_json(content: str) -> Dict[str, Any]:
+        """从 LLM 输出中提取第一个完整的 JSON 对象，忽略前后的说明文字和代码块标记"""
+        return extract_json_object(content)
 
 
 def demo_llm_planning():
+    # LLMClient 会加载 OpenAI SDK 和全部工具，只在真正调用 LLM 规划时导入
+    from llm.client import LLMClient
+
     client = LLMClient(model="gpt-4-turbo")
     agent = TaskPlanningAgent(client)
 
@@ -99,21 +131,20 @@ def demo_llm_planning():
         tasks.append(task)
 
     planner = TaskPlanner()
-    for task in tasks:
-        planner.add_task(task)
+    planner.add_tasks(tasks)
 
     print("\n解析为 Task 对象后的任务列表:")
     for task in planner.get_ready_tasks():
         print(f"  • [{task.priority}级] {task.id} - {task.title} ({task.estimated_hours}小时)")
 
 
-class TaskStatus(Enum):
-    """任务状态枚举"""
-    PENDING = "pending"
-    IN_PROGRESS = "in_progress"
-    COMPLETED = "completed"
-    BLOCKED = "blocked"
-    FAILED = "failed"
+class TaskStatus(IntEnum):
+    """任务状态枚举（整数值，序列化时使用小写名称）"""
+    PENDING = 0
+    IN_PROGRESS = 1
+    COMPLETED = 2
+    BLOCKED = 3
+    FAILED = 4
 
 @dataclass
 class Task:
@@ -131,6 +162,10 @@ class Task:
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     metadata: Dict[str, Any] = None
+    # 完成状态变化时的回调 (任务, 变化前状态)，TaskPlanner 借此同步依赖索引；不参与构造、比较和序列化
+    _status_listeners: List[Callable[["Task", TaskStatus], None]] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
     
     def __post_init__(self):
         if self.dependencies is None:
@@ -140,85 +175,283 @@ class Task:
         if self.metadata is None:
             self.metadata = {}
     
-    def can_start(self, completed_tasks: List[str]) -> bool:
+    @functools.cached_property
+    def _created_iso(self) -> str:
+        # created_at 创建后不再变化，ISO 字符串首次序列化时生成一次
+        return self.created_at.isoformat()
+    
+    def can_start(self, completed_tasks: Set[str]) -> bool:
         """检查任务是否可以开始（依赖是否满足）"""
         return all(dep in completed_tasks for dep in self.dependencies)
     
     def start_task(self) -> None:
         """开始任务"""
-        if self.status == TaskStatus.PENDING:
+        if self.status is TaskStatus.PENDING:
             self.status = TaskStatus.IN_PROGRESS
             self.started_at = datetime.now()
     
     def complete_task(self) -> None:
         """完成任务"""
-        if self.status == TaskStatus.IN_PROGRESS:
+        if self.status is TaskStatus.IN_PROGRESS:
             self.status = TaskStatus.COMPLETED
             self.completed_at = datetime.now()
             if self.started_at:
                 self.actual_hours = (self.completed_at - self.started_at).total_seconds() / 3600
+            self._notify(TaskStatus.IN_PROGRESS)
     
     def block_task(self, reason: str) -> None:
         """阻塞任务"""
+        previous = self.status
         self.status = TaskStatus.BLOCKED
         self.metadata["blocking_reason"] = reason
+        if previous is TaskStatus.COMPLETED:
+            self._notify(previous)
+    
+    def _notify(self, previous: TaskStatus) -> None:
+        for callback in self._status_listeners:
+            callback(self, previous)
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
-        result = asdict(self)
-        result["status"] = self.status.value
-        result["created_at"] = self.created_at.isoformat() if self.created_at else None
-        result["started_at"] = self.started_at.isoformat() if self.started_at else None
-        result["completed_at"] = self.completed_at.isoformat() if self.completed_at else None
-        return result
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "status": self.status.name.lower(),
+            "priority": self.priority,
+            "estimated_hours": self.estimated_hours,
+            "actual_hours": self.actual_hours,
+            "dependencies": list(self.dependencies),
+            "assigned_to": self.assigned_to,
+            "created_at": self._created_iso,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "metadata": dict(self.metadata),
+        }
+
+# 计划可视化的固定头部，占位符由 plan_project_timeline 的结果填充
+_PLAN_HEADER = string.Template("""
+📋 项目计划可视化 - $project_name
+==================================================
+
+📅 项目概览:
+  开始日期: $start_date
+  预计完成: $earliest_completion_date
+  总任务数: $total_tasks
+  完成进度: $completion_percentage%
+
+📊 任务状态分布:
+  ✅ 已完成: $completed_tasks 个任务
+  🔄 进行中: $in_progress_tasks 个任务
+  ⏳ 待开始: $pending_tasks 个任务
+  ⛔ 已阻塞: $blocked_tasks 个任务
+
+⏱️  工时统计:
+  预估工时: $total_estimated_hours 小时
+  实际工时: $total_actual_hours 小时
+  效率比率: $efficiency%
+
+🎯 可以立即开始的任务:""")
+
 
 class TaskPlanner:
-    """任务规划器"""
+    """任务规划器
+    
+    依赖关系以索引维护：每个任务剩余未完成的依赖数、反向依赖表和依赖已满足的
+    就绪堆。加入规划器的任务在 Task.complete_task() 时回调规划器同步索引，
+    直接调用任务方法或规划器方法均可。
+    """
     
     def __init__(self):
         self.tasks: Dict[str, Task] = {}
         self.project_name = "Claude Task Planning Demo"
         self.start_date = datetime.now()
+        self._completed_ids: Set[str] = set()
+        self._dep_count: Dict[str, int] = {}
+        self._reverse_deps: Dict[str, List[str]] = {}
+        # (-优先级, 加入顺序, 任务ID)，同优先级按加入顺序排列
+        self._ready_heap: List[Tuple[int, int, str]] = []
+        self._seq = itertools.count()
+        # 依赖分层结果，任务集合变化时失效
+        self._layers: Optional[List[List[str]]] = None
     
     def add_task(self, task: Task) -> None:
-        """添加任务"""
+        """添加任务；ID 已存在时替换原任务并重建索引"""
+        replacing = task.id in self.tasks
+        self._attach(task)
         self.tasks[task.id] = task
+        if replacing:
+            self._rebuild_indexes()
+            return
+        self._layers = None
+        for dep in task.dependencies:
+            self._reverse_deps.setdefault(dep, []).append(task.id)
+        self._dep_count[task.id] = sum(1 for dep in task.dependencies if dep not in self._completed_ids)
+        if task.status is TaskStatus.COMPLETED:
+            self._mark_completed(task.id)
+        if self._dep_count[task.id] == 0:
+            self._push_ready(task)
+    
+    def add_tasks(self, tasks: Iterable[Task]) -> None:
+        """批量添加任务，全部加入后一次性重建依赖索引"""
+        for task in tasks:
+            self._attach(task)
+            self.tasks[task.id] = task
+        self._rebuild_indexes()
+    
+    def _attach(self, task: Task) -> None:
+        """为任务注册状态回调；同一 ID 的旧任务对象解除回调"""
+        old = self.tasks.get(task.id)
+        if old is not None and old is not task and self._on_task_status in old._status_listeners:
+            old._status_listeners.remove(self._on_task_status)
+        if self._on_task_status not in task._status_listeners:
+            task._status_listeners.append(self._on_task_status)
+    
+    def _on_task_status(self, task: Task, previous: TaskStatus) -> None:
+        if self.tasks.get(task.id) is not task:
+            return
+        if task.status is TaskStatus.COMPLETED:
+            self._mark_completed(task.id)
+        elif previous is TaskStatus.COMPLETED:
+            self._unmark_completed(task.id)
+    
+    def _rebuild_indexes(self) -> None:
+        """根据当前任务全量重建已完成集合、依赖计数、反向依赖表和就绪堆"""
+        self._layers = None
+        self._completed_ids = {
+            task_id for task_id, task in self.tasks.items() if task.status is TaskStatus.COMPLETED
+        }
+        self._dep_count = {}
+        self._reverse_deps = {}
+        self._ready_heap = []
+        self._seq = itertools.count()
+        for task_id, task in self.tasks.items():
+            for dep in task.dependencies:
+                self._reverse_deps.setdefault(dep, []).append(task_id)
+            self._dep_count[task_id] = sum(1 for dep in task.dependencies if dep not in self._completed_ids)
+            if self._dep_count[task_id] == 0:
+                self._ready_heap.append((-task.priority, next(self._seq), task_id))
+        heapq.heapify(self._ready_heap)
     
     def get_task(self, task_id: str) -> Optional[Task]:
         """获取任务"""
         return self.tasks.get(task_id)
     
-    def get_ready_tasks(self) -> List[Task]:
-        """获取可以开始的任务（依赖已满足）"""
-        completed_task_ids = [
-            task_id for task_id, task in self.tasks.items() 
-            if task.status == TaskStatus.COMPLETED
+    def start_task(self, task_id: str) -> None:
+        """开始任务"""
+        self.tasks[task_id].start_task()
+    
+    def complete_task(self, task_id: str) -> None:
+        """完成任务，并释放依赖它的任务"""
+        self.tasks[task_id].complete_task()
+    
+    def get_ready_tasks(self, limit: Optional[int] = None) -> List[Task]:
+        """获取可以开始的任务（依赖已满足），按优先级排序；指定 limit 时只取前 limit 个"""
+        if limit is not None:
+            return self.top_ready(limit)
+        # 堆中的任务依赖均已满足，只需跳过已不处于待开始状态的任务
+        return [
+            self.tasks[task_id] for _, _, task_id in sorted(self._ready_heap)
+            if self.tasks[task_id].status is TaskStatus.PENDING
         ]
+    
+    def top_ready(self, k: int) -> List[Task]:
+        """获取优先级最高的 k 个可开始任务，O(N log k)，不做全量排序"""
+        entries = heapq.nsmallest(k, (
+            entry for entry in self._ready_heap
+            if self.tasks[entry[2]].status is TaskStatus.PENDING
+        ))
+        return [self.tasks[task_id] for _, _, task_id in entries]
+    
+    def get_execution_layers(self) -> List[List[Task]]:
+        """
+        按依赖关系对任务分层（Kahn 拓扑排序），同一层的任务互不依赖，可以并行执行
         
-        ready_tasks = [
-            task for task in self.tasks.values()
-            if task.status == TaskStatus.PENDING and task.can_start(completed_task_ids)
-        ]
+        不在规划器中的依赖视为外部前置条件，不参与分层。
+        
+        Returns:
+            任务分层列表，层内按优先级从高到低排序
+        
+        Raises:
+            ValueError: 任务依赖存在循环
+        """
+        if self._layers is None:
+            sorter = graphlib.TopologicalSorter(
+                {task_id: task.dependencies for task_id, task in self.tasks.items()}
+            )
+            try:
+                sorter.prepare()
+            except graphlib.CycleError as e:
+                raise ValueError(f"任务依赖存在循环: {e.args[1]}") from e
+            
+            layers = []
+            while sorter.is_active():
+                ready = sorter.get_ready()
+                sorter.done(*ready)
+                layer = sorted(
+                    (task_id for task_id in ready if task_id in self.tasks),
+                    key=lambda task_id: -self.tasks[task_id].priority
+                )
+                if layer:
+                    layers.append(layer)
+            self._layers = layers
         
-        # 按优先级排序
-        return sorted(ready_tasks, key=lambda x: x.priority, reverse=True)
+        return [[self.tasks[task_id] for task_id in layer] for layer in self._layers]
+    
+    def _push_ready(self, task: Task) -> None:
+        heapq.heappush(self._ready_heap, (-task.priority, next(self._seq), task.id))
+    
+    def _mark_completed(self, task_id: str) -> None:
+        """记录已完成任务，依赖数归零的后续任务进入就绪堆"""
+        if task_id in self._completed_ids:
+            return
+        self._completed_ids.add(task_id)
+        for dependent_id in self._reverse_deps.get(task_id, ()):
+            if dependent_id not in self._dep_count:
+                continue
+            self._dep_count[dependent_id] -= 1
+            if self._dep_count[dependent_id] == 0:
+                self._push_ready(self.tasks[dependent_id])
+    
+    def _unmark_completed(self, task_id: str) -> None:
+        """已完成任务回退（如被阻塞）时恢复后续任务的依赖计数，并移出就绪堆"""
+        if task_id not in self._completed_ids:
+            return
+        self._completed_ids.discard(task_id)
+        reopened = set()
+        for dependent_id in self._reverse_deps.get(task_id, ()):
+            if dependent_id not in self._dep_count:
+                continue
+            if self._dep_count[dependent_id] == 0:
+                reopened.add(dependent_id)
+            self._dep_count[dependent_id] += 1
+        if reopened:
+            self._ready_heap = [entry for entry in self._ready_heap if entry[2] not in reopened]
+            heapq.heapify(self._ready_heap)
     
     def get_blocked_tasks(self) -> List[Task]:
         """获取被阻塞的任务"""
-        return [task for task in self.tasks.values() if task.status == TaskStatus.BLOCKED]
+        return [task for task in self.tasks.values() if task.status is TaskStatus.BLOCKED]
     
     def get_in_progress_tasks(self) -> List[Task]:
         """获取进行中的任务"""
-        return [task for task in self.tasks.values() if task.status == TaskStatus.IN_PROGRESS]
+        return [task for task in self.tasks.values() if task.status is TaskStatus.IN_PROGRESS]
     
     def get_completed_tasks(self) -> List[Task]:
         """获取已完成的任务"""
-        return [task for task in self.tasks.values() if task.status == TaskStatus.COMPLETED]
+        return [task for task in self.tasks.values() if task.status is TaskStatus.COMPLETED]
     
     def plan_project_timeline(self) -> Dict[str, Any]:
         """规划项目时间线"""
-        total_estimated_hours = sum(task.estimated_hours for task in self.tasks.values())
-        total_actual_hours = sum(task.actual_hours for task in self.tasks.values())
+        # 一次遍历同时统计工时和各状态任务数
+        total_estimated_hours = 0.0
+        total_actual_hours = 0.0
+        status_counts = dict.fromkeys(TaskStatus, 0)
+        for task in self.tasks.values():
+            total_estimated_hours += task.estimated_hours
+            total_actual_hours += task.actual_hours
+            status_counts[task.status] += 1
+        completed = status_counts[TaskStatus.COMPLETED]
         
         # 简单的串行估算（实际项目中应该考虑并行执行）
         earliest_completion = self.start_date + timedelta(hours=total_estimated_hours)
@@ -227,60 +460,45 @@ class TaskPlanner:
             "project_name": self.project_name,
             "start_date": self.start_date.isoformat(),
             "total_tasks": len(self.tasks),
-            "completed_tasks": len(self.get_completed_tasks()),
-            "in_progress_tasks": len(self.get_in_progress_tasks()),
-            "pending_tasks": len([t for t in self.tasks.values() if t.status == TaskStatus.PENDING]),
-            "blocked_tasks": len(self.get_blocked_tasks()),
+            "completed_tasks": completed,
+            "in_progress_tasks": status_counts[TaskStatus.IN_PROGRESS],
+            "pending_tasks": status_counts[TaskStatus.PENDING],
+            "blocked_tasks": status_counts[TaskStatus.BLOCKED],
             "total_estimated_hours": round(total_estimated_hours, 2),
             "total_actual_hours": round(total_actual_hours, 2),
             "earliest_completion_date": earliest_completion.isoformat(),
-            "completion_percentage": round(len(self.get_completed_tasks()) / len(self.tasks) * 100, 1) if self.tasks else 0
+            "completion_percentage": round(completed / len(self.tasks) * 100, 1) if self.tasks else 0
         }
     
     def visualize_plan(self) -> str:
         """可视化任务计划"""
         timeline = self.plan_project_timeline()
         
-        visualization = f"""
-📋 项目计划可视化 - {self.project_name}
-{'='*50}
-
-📅 项目概览:
-  开始日期: {timeline['start_date'][:10]}
-  预计完成: {timeline['earliest_completion_date'][:10]}
-  总任务数: {timeline['total_tasks']}
-  完成进度: {timeline['completion_percentage']}%
-
-📊 任务状态分布:
-  ✅ 已完成: {timeline['completed_tasks']} 个任务
-  🔄 进行中: {timeline['in_progress_tasks']} 个任务
-  ⏳ 待开始: {timeline['pending_tasks']} 个任务
-  ⛔ 已阻塞: {timeline['blocked_tasks']} 个任务
-
-⏱️  工时统计:
-  预估工时: {timeline['total_estimated_hours']} 小时
-  实际工时: {timeline['total_actual_hours']} 小时
-  效率比率: {round(timeline['total_actual_hours']/timeline['total_estimated_hours']*100, 1) if timeline['total_estimated_hours'] > 0 else 0}%
-
-🎯 可以立即开始的任务:
-"""
+        lines = [_PLAN_HEADER.substitute(
+            timeline,
+            start_date=timeline["start_date"][:10],
+            earliest_completion_date=timeline["earliest_completion_date"][:10],
+            efficiency=round(timeline["total_actual_hours"] / timeline["total_estimated_hours"] * 100, 1)
+            if timeline["total_estimated_hours"] > 0 else 0,
+        )]
         
-        ready_tasks = self.get_ready_tasks()
+        ready_tasks = self.top_ready(5)  # 显示前5个
         if ready_tasks:
-            for i, task in enumerate(ready_tasks[:5], 1):  # 显示前5个
-                visualization += f"  {i}. [{task.priority}级] {task.title}\n"
-                visualization += f"     预估: {task.estimated_hours}小时\n"
+            for i, task in enumerate(ready_tasks, 1):
+                lines.append(f"  {i}. [{task.priority}级] {task.title}")
+                lines.append(f"     预估: {task.estimated_hours}小时")
         else:
-            visualization += "  暂无可以开始的任务\n"
+            lines.append("  暂无可以开始的任务")
         
         blocked_tasks = self.get_blocked_tasks()
         if blocked_tasks:
-            visualization += "\n🚧 阻塞的任务:\n"
+            lines.append("\n🚧 阻塞的任务:")
             for task in blocked_tasks[:3]:  # 显示前3个
                 reason = task.metadata.get("blocking_reason", "未知原因")
-                visualization += f"  • {task.title} - 阻塞原因: {reason}\n"
+                lines.append(f"  • {task.title} - 阻塞原因: {reason}")
         
-        return visualization
+        lines.append("")
+        return "\n".join(lines)
 
 
 def demo_task_planning():
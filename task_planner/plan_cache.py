@@ -0,0 +1,128 @@
+"""
+任务规划结果缓存
+精确匹配 + 相似目标匹配，命中时跳过 LLM 规划请求
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from utils.similarity import bigram_profile, cosine_similarity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ".cache",
+    "plan_cache.db"
+)
+
+
+class PlanCache:
+    """规划结果缓存（SQLite 持久化）"""
+
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH,
+                 similarity_threshold: float = 0.92,
+                 ttl_seconds: float = 7 * 24 * 3600,
+                 enabled: Optional[bool] = None):
+        """
+        Args:
+            db_path: 缓存数据库路径
+            similarity_threshold: 相似目标命中的最低余弦相似度
+            ttl_seconds: 缓存有效期（秒）
+            enabled: 是否启用缓存，默认与 LLM 响应缓存一致（LLM_CACHE_DISABLE=1 关闭）
+        """
+        self.db_path = db_path
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.enabled = os.getenv("LLM_CACHE_DISABLE", "0") != "1" if enabled is None else enabled
+
+        # 相似匹配用的内存索引：(scope, 目标) → (目标向量, 规划结果, 写入时间)
+        self._entries: Dict[Tuple[str, str], Tuple[Counter, Dict[str, Any], float]] = {}
+        self.conn = None
+        if not self.enabled:
+            return
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS plan_cache (
+                key TEXT PRIMARY KEY,
+                scope TEXT NOT NULL,
+                goal TEXT NOT NULL,
+                plan_json TEXT NOT NULL,
+                ts REAL NOT NULL
+            )
+        """)
+        self.conn.execute("DELETE FROM plan_cache WHERE ts < ?", (time.time() - ttl_seconds,))
+        self.conn.commit()
+
+        self._entries = {
+            (scope, goal): (bigram_profile(goal), json.loads(plan_json), ts)
+            for scope, goal, plan_json, ts in self.conn.execute(
+                "SELECT scope, goal, plan_json, ts FROM plan_cache"
+            )
+        }
+
+    @staticmethod
+    def make_scope(model: str, system_prompt: str) -> str:
+        """同一模型和系统提示词下的结果才可以互相复用"""
+        payload = json.dumps({"model": model, "system": system_prompt}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def make_key(scope: str, goal: str) -> str:
+        """精确匹配的缓存键"""
+        return hashlib.sha256(f"{scope}\n{goal}".encode("utf-8")).hexdigest()
+
+    def get(self, scope: str, goal: str) -> Optional[Dict[str, Any]]:
+        """查找缓存：先精确匹配，未命中再按目标相似度匹配"""
+        if not self.enabled:
+            return None
+
+        min_ts = time.time() - self.ttl_seconds
+        row = self.conn.execute(
+            "SELECT plan_json FROM plan_cache WHERE key = ? AND ts >= ?",
+            (self.make_key(scope, goal), min_ts)
+        ).fetchone()
+        if row:
+            logger.info("规划缓存精确命中")
+            return json.loads(row[0])
+
+        profile = bigram_profile(goal)
+        best_score, best_plan = 0.0, None
+        expired = []
+        for (entry_scope, entry_goal), (entry_profile, plan, ts) in self._entries.items():
+            if ts < min_ts:
+                expired.append((entry_scope, entry_goal))
+                continue
+            if entry_scope != scope:
+                continue
+            score = cosine_similarity(profile, entry_profile)
+            if score > best_score:
+                best_score, best_plan = score, plan
+        for entry_key in expired:
+            del self._entries[entry_key]
+
+        if best_plan is not None and best_score >= self.similarity_threshold:
+            logger.info("规划缓存相似命中，相似度 %.3f", best_score)
+            return best_plan
+        return None
+
+    def put(self, scope: str, goal: str, plan: Dict[str, Any]) -> None:
+        """写入缓存（同一 scope 和目标覆盖旧记录）"""
+        if not self.enabled:
+            return
+
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO plan_cache (key, scope, goal, plan_json, ts) VALUES (?, ?, ?, ?, ?)",
+            (self.make_key(scope, goal), scope, goal, json.dumps(plan, ensure_ascii=False), now)
+        )
+        self.conn.commit()
+        self._entries[(scope, goal)] = (bigram_profile(goal), plan, now)
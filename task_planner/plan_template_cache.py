@@ -0,0 +1,119 @@
+"""
+规划模板缓存
+保存成功的规划作为模板，相似目标只需让 LLM 改写模板，无需从头规划
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from utils.similarity import bigram_profile, cosine_similarity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ".cache",
+    "plan_templates.db"
+)
+
+# 模板中保留的任务字段（id 等实例相关字段不保留）
+TEMPLATE_TASK_FIELDS = ("title", "description", "priority", "estimated_hours")
+
+
+class PlanTemplateStore:
+    """规划模板存储（SQLite 持久化）"""
+
+    def __init__(self, db_path: str = DEFAULT_TEMPLATE_PATH, max_templates: int = 100,
+                 enabled: Optional[bool] = None):
+        """
+        Args:
+            db_path: 模板数据库路径
+            max_templates: 最多保留的模板数量，超出时删除最旧的
+            enabled: 是否启用模板，默认与 LLM 响应缓存一致（LLM_CACHE_DISABLE=1 关闭）
+        """
+        self.db_path = db_path
+        self.max_templates = max_templates
+        self.enabled = os.getenv("LLM_CACHE_DISABLE", "0") != "1" if enabled is None else enabled
+
+        # 相似匹配用的内存索引：目标 → (目标向量, 模板)，按写入顺序排列
+        self._entries: Dict[str, Tuple[Counter, Dict[str, Any]]] = {}
+        self.conn = None
+        if not self.enabled:
+            return
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS plan_templates (
+                goal TEXT PRIMARY KEY,
+                template_json TEXT NOT NULL,
+                ts REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+        self._entries = {
+            goal: (bigram_profile(goal), json.loads(template_json))
+            for goal, template_json in self.conn.execute(
+                "SELECT goal, template_json FROM plan_templates ORDER BY ts"
+            )
+        }
+
+    @staticmethod
+    def to_template(plan: Dict[str, Any]) -> Dict[str, Any]:
+        """从规划结果中提取模板"""
+        return {
+            "tasks": [
+                {field: task.get(field) for field in TEMPLATE_TASK_FIELDS}
+                for task in plan.get("tasks", [])
+                if isinstance(task, dict)
+            ],
+            "execution_notes": plan.get("execution_notes", ""),
+        }
+
+    def store(self, goal: str, plan: Dict[str, Any]) -> None:
+        """保存规划模板（同一目标覆盖旧模板）"""
+        if not self.enabled:
+            return
+
+        template = self.to_template(plan)
+        if not template["tasks"]:
+            return
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO plan_templates (goal, template_json, ts) VALUES (?, ?, ?)",
+            (goal, json.dumps(template, ensure_ascii=False), time.time())
+        )
+        self.conn.execute(
+            "DELETE FROM plan_templates WHERE goal NOT IN "
+            "(SELECT goal FROM plan_templates ORDER BY ts DESC LIMIT ?)",
+            (self.max_templates,)
+        )
+        self.conn.commit()
+        # 先删除再插入，使该目标移到最新位置
+        self._entries.pop(goal, None)
+        self._entries[goal] = (bigram_profile(goal), template)
+        for old_goal in list(self._entries)[:-self.max_templates]:
+            del self._entries[old_goal]
+
+    def lookup(self, goal: str, threshold: float = 0.6) -> Optional[Dict[str, Any]]:
+        """查找与目标最相似的模板，相似度低于阈值时返回 None"""
+        if not self.enabled:
+            return None
+
+        profile = bigram_profile(goal)
+        best_score, best_template = 0.0, None
+        for entry_profile, template in self._entries.values():
+            score = cosine_similarity(profile, entry_profile)
+            if score > best_score:
+                best_score, best_template = score, template
+
+        if best_template is not None and best_score >= threshold:
+            logger.info("命中规划模板，相似度 %.3f", best_score)
+            return best_template
+        return None
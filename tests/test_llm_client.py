@@ -0,0 +1,65 @@
+"""
+LLMClient 对话窗口测试（不访问网络）
+"""
+
+import os
+import unittest
+from concurrent.futures import Future
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ["ENABLE_LOGGING"] = "false"
+
+from llm.client import LLMClient
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class WindowTest(unittest.TestCase):
+    """历史窗口淘汰后当前用户问题仍然保留"""
+
+    def setUp(self):
+        os.environ["MAX_CONVERSATION_HISTORY"] = "2"
+        self.addCleanup(os.environ.pop, "MAX_CONVERSATION_HISTORY", None)
+        self.client = LLMClient(model="test-model")
+        self.client.rate_limiter.acquire = lambda *args, **kwargs: None
+        self.sent = []
+
+    def _fake_stream_turn(self, messages, tool_choice, executor):
+        """每轮并行调用 3 个工具，第 4 轮给出最终回答"""
+        self.sent.append(messages)
+        turn = len(self.sent)
+        if turn == 4:
+            return {"role": "assistant", "content": "完成"}, []
+        tool_calls = [
+            {"id": f"call_{turn}_{i}", "type": "function",
+             "function": {"name": "get_current_time", "arguments": "{}"}}
+            for i in range(3)
+        ]
+        assistant = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+        return assistant, [(call, _done({"success": True})) for call in tool_calls]
+
+    def test_user_turn_survives_eviction(self):
+        self.client._stream_turn = self._fake_stream_turn
+        question = {"role": "user", "content": "现在几点？"}
+        result = self.client._chat(
+            [{"role": "system", "content": "sys"}, question], "auto", max_turns=5
+        )
+
+        self.assertTrue(result["success"])
+        self.assertEqual(len(self.sent), 4)
+        for messages in self.sent + [result["messages"]]:
+            self.assertEqual(messages[0]["role"], "system")
+            self.assertIs(messages[1], question)
+            # 用户问题之后不能以孤立的工具结果开头
+            if len(messages) > 2:
+                self.assertNotEqual(messages[2]["role"], "tool")
+        # 窗口确实发生了淘汰：第一轮的助手消息已不在最后一次请求中
+        self.assertLess(len(self.sent[3]), 2 + 4 * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+TaskPlanner 依赖索引测试
+"""
+
+import unittest
+
+from task_planner.demo import Task, TaskPlanner
+
+
+def _ready_ids(planner):
+    return [task.id for task in planner.get_ready_tasks()]
+
+
+class DependencyIndexTest(unittest.TestCase):
+    """依赖索引与任务实时状态保持一致"""
+
+    def setUp(self):
+        self.planner = TaskPlanner()
+        self.planner.add_task(Task("a", "A", "A"))
+        self.planner.add_task(Task("b", "B", "B", dependencies=["a"]))
+
+    def _complete_a(self):
+        task = self.planner.tasks["a"]
+        task.start_task()
+        task.complete_task()
+
+    def test_task_methods_release_dependents(self):
+        self.assertEqual(_ready_ids(self.planner), ["a"])
+        self._complete_a()
+        self.assertEqual(_ready_ids(self.planner), ["b"])
+
+    def test_blocking_completed_task_withdraws_dependents(self):
+        self._complete_a()
+        self.planner.tasks["a"].block_task("需要返工")
+        self.assertEqual(_ready_ids(self.planner), [])
+        self.assertEqual(self.planner.top_ready(5), [])
+
+    def test_readding_task_does_not_duplicate(self):
+        self.planner.add_task(Task("a", "A", "A", priority=3))
+        self.assertEqual(_ready_ids(self.planner), ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,41 +1,118 @@
 """
 工具模块初始化
-注册所有可用工具
+注册所有可用工具（按需导入并实例化）
 """
 
-# 修复相对导入问题
+import importlib
 import sys
-import os
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from tools.weather import WeatherTool
-from tools.email import EmailTool  
-from tools.calculator import CalculatorTool
-from tools.get_time import TimeTool
-from tools.context_manager import ContextManagerTool
-from tools.database import DatabaseTool
-
-# 工具注册表
-TOOL_REGISTRY = {
-    "get_weather": WeatherTool(),
-    "send_email": EmailTool(),
-    "calculate": CalculatorTool(),
-    "get_current_time": TimeTool(),
-    "manage_context": ContextManagerTool(),
-    "execute_sql": DatabaseTool(),
+from typing import Any, Dict, List, Optional, Tuple
+
+# 工具名称 → (模块名, 类名)，首次使用时才导入模块并创建实例
+_TOOL_FACTORIES: Dict[str, Tuple[str, str]] = {
+    "get_weather": ("weather", "WeatherTool"),
+    "send_email": ("email", "EmailTool"),
+    "calculate": ("calculator", "CalculatorTool"),
+    "get_current_time": ("get_time", "TimeTool"),
+    "manage_context": ("context_manager", "ContextManagerTool"),
+    "execute_sql": ("database", "DatabaseTool"),
 }
 
+# 工具类名 → 模块名，供 PEP 562 模块级 __getattr__ 按需解析
+_TOOL_CLASSES: Dict[str, str] = {cls_name: module for module, cls_name in _TOOL_FACTORIES.values()}
+
+
+class _ToolRegistry(dict):
+    """工具注册表：增删工具时清除依赖注册表的缓存（工具定义列表、参数验证器的授权名单）"""
+
+    def __setitem__(self, name, tool):
+        super().__setitem__(name, tool)
+        invalidate_tool_caches()
+
+    def __delitem__(self, name):
+        super().__delitem__(name)
+        invalidate_tool_caches()
+
+    def pop(self, *args):
+        tool = super().pop(*args)
+        invalidate_tool_caches()
+        return tool
+
+    def popitem(self):
+        item = super().popitem()
+        invalidate_tool_caches()
+        return item
+
+    def setdefault(self, name, tool=None):
+        if name not in self:
+            self[name] = tool
+        return self[name]
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        invalidate_tool_caches()
+
+    def clear(self):
+        super().clear()
+        invalidate_tool_caches()
+
+
+# 工具注册表（已实例化的工具，也可直接写入自定义工具）
+TOOL_REGISTRY: Dict[str, Any] = _ToolRegistry()
+
+# 启用工具的 OpenAI 格式定义，首次使用时构建，注册表变化时清除
+_ALL_TOOLS_CACHE: Optional[List[Dict[str, Any]]] = None
+
+
+def invalidate_tool_caches() -> None:
+    """清除工具定义缓存和参数验证器的授权名单；修改工具的 enabled 后需手动调用"""
+    global _ALL_TOOLS_CACHE
+    _ALL_TOOLS_CACHE = None
+    from utils.validators import invalidate_validator_cache
+    invalidate_validator_cache()
+
+
+def __getattr__(name: str):
+    """按需导入工具类，如 ``from tools import WeatherTool``"""
+    module = _TOOL_CLASSES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{module}", __name__), name)
+
+
+def _load_tool(name: str):
+    """实例化单个工具并缓存到注册表"""
+    module, cls_name = _TOOL_FACTORIES[name]
+    tool = TOOL_REGISTRY[name] = getattr(importlib.import_module(f".{module}", __name__), cls_name)()
+    return tool
+
+
+def _load_all_tools() -> Dict[str, Any]:
+    """实例化全部内置工具"""
+    for name in _TOOL_FACTORIES:
+        if name not in TOOL_REGISTRY:
+            _load_tool(name)
+    # 内置工具按声明顺序在前，自定义工具在后
+    ordered = {name: TOOL_REGISTRY[name] for name in _TOOL_FACTORIES}
+    ordered.update(TOOL_REGISTRY)
+    return ordered
+
 def get_all_tools():
-    """获取所有工具的 OpenAI 格式定义"""
-    return [tool.to_openai_format() for tool in TOOL_REGISTRY.values() if tool.enabled]
+    """获取所有启用工具的 OpenAI 格式定义（缓存，注册表变化时重建）"""
+    global _ALL_TOOLS_CACHE
+    if _ALL_TOOLS_CACHE is None:
+        _ALL_TOOLS_CACHE = [tool.to_openai_format() for tool in _load_all_tools().values() if tool.enabled]
+    return _ALL_TOOLS_CACHE
 
 def get_tool_by_name(name: str):
     """根据名称获取工具实例"""
-    return TOOL_REGISTRY.get(name)
+    tool = TOOL_REGISTRY.get(name)
+    if tool is None and name in _TOOL_FACTORIES:
+        tool = _load_tool(name)
+    return tool
 
 def get_enabled_tool_names():
-    """获取所有启用的工具名称"""
-    return [name for name, tool in TOOL_REGISTRY.items() if tool.enabled]
+    """获取所有启用的工具名称（驻留字符串，查表时可按对象身份快速比较）"""
+    return [sys.intern(name) for name, tool in _load_all_tools().items() if tool.enabled]
 
 # 便捷函数
 def demo_all_tools():
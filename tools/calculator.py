@@ -3,7 +3,9 @@
 执行精确数学计算
 """
 
+from types import CodeType
 from typing import Dict, Any, Union
+import functools
 import logging
 import ast
 import operator
@@ -11,6 +13,15 @@ import sys
 
 logger = logging.getLogger(__name__)
 
+# 数字常量节点类型：Python 3.8+ 为 ast.Constant，3.7 及以下为 ast.Num（导入时判断一次）
+if sys.version_info >= (3, 8):
+    _CONST_CLS, _CONST_FIELD = ast.Constant, "value"
+else:
+    _CONST_CLS, _CONST_FIELD = ast.Num, "n"
+
+# 表达式中允许的字符（按字节删除）
+_ALLOWED_BYTES = b"0123456789+-*/%.() "
+
 class CalculatorTool:
     """计算器工具"""
     
@@ -30,25 +41,28 @@ class CalculatorTool:
         ast.UAdd: operator.pos,
     }
     
-    def to_openai_format(self) -> Dict[str, Any]:
-        """转换为 OpenAI 工具格式"""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "expression": {
-                            "type": "string",
-                            "description": "数学表达式，如'2+2'、'(3+5)*10'、'2**10'"
-                        }
-                    },
-                    "required": ["expression"]
-                }
+    # OpenAI 工具格式定义在类定义时构建一次，所有实例共享
+    _OPENAI_FORMAT = {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "expression": {
+                        "type": "string",
+                        "description": "数学表达式，如'2+2'、'(3+5)*10'、'2**10'"
+                    }
+                },
+                "required": ["expression"]
             }
         }
+    }
+    
+    def to_openai_format(self) -> Dict[str, Any]:
+        """转换为 OpenAI 工具格式"""
+        return self._OPENAI_FORMAT
     
     def execute(self, expression: str) -> Dict[str, Any]:
         """执行计算"""
@@ -63,7 +77,7 @@ class CalculatorTool:
             # 计算结果
             result = self._safe_eval(expression)
             
-            logger.info(f"计算成功：{expression} = {result}")
+            logger.info("计算成功：%s = %s", expression, result)
             return {
                 "success": True,
                 "data": {
@@ -86,54 +100,40 @@ class CalculatorTool:
     
     def _is_safe_expression(self, expression: str) -> bool:
         """验证表达式安全性"""
-        # 只允许数字、运算符和括号
-        allowed_chars = set("0123456789+-*/%.() ")
-        return all(c in allowed_chars for c in expression)
+        # 只允许数字、运算符和括号：ASCII 串按字节删除允许的字符后应为空串
+        return expression.isascii() and not expression.encode("ascii").translate(None, _ALLOWED_BYTES)
     
     def _safe_eval(self, expression: str) -> Union[int, float]:
         """安全计算表达式"""
-        # 解析表达式
+        # 表达式只解析、校验和编译一次，之后直接执行字节码
+        return eval(self._compile(expression), {"__builtins__": {}}, {})
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _compile(expression: str) -> CodeType:
+        """校验AST只含数字常量和允许的运算符后编译为字节码"""
         node = ast.parse(expression, mode='eval')
-        return self._eval_node(node.body)
+        CalculatorTool._check_node(node.body)
+        return compile(node, "<calc>", "eval")
     
-    def _eval_node(self, node: ast.AST) -> Union[int, float]:
-        """递归计算AST节点"""
-        # 处理不同Python版本的兼容性
-        python_version = sys.version_info
-        
-        if python_version.major == 3 and python_version.minor <= 7:
-            # Python 3.7及以下使用ast.Num
-            if isinstance(node, ast.Num):
-                return node.n
-        else:
-            # Python 3.8+使用ast.Constant
-            if isinstance(node, ast.Constant):
-                if isinstance(node.value, (int, float)):
-                    return node.value
+    @classmethod
+    def _check_node(cls, node: ast.AST) -> None:
+        """递归校验AST节点"""
+        if isinstance(node, _CONST_CLS):
+            if not isinstance(getattr(node, _CONST_FIELD), (int, float)):
                 raise ValueError("只支持数字常量")
-        
-        if isinstance(node, ast.BinOp):
-            left = self._eval_node(node.left)
-            right = self._eval_node(node.right)
-            op_type = type(node.op)
-            if op_type in self.OPERATORS:
-                return self.OPERATORS[op_type](left, right)
-            raise ValueError(f"不支持的运算符：{op_type}")
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in cls.OPERATORS:
+                raise ValueError(f"不支持的运算符：{type(node.op)}")
+            cls._check_node(node.left)
+            cls._check_node(node.right)
         elif isinstance(node, ast.UnaryOp):
-            operand = self._eval_node(node.operand)
-            op_type = type(node.op)
-            if op_type in self.OPERATORS:
-                return self.OPERATORS[op_type](operand)
-            raise ValueError(f"不支持的一元运算符：{op_type}")
+            if type(node.op) not in cls.OPERATORS:
+                raise ValueError(f"不支持的一元运算符：{type(node.op)}")
+            cls._check_node(node.operand)
         else:
-            # 如果是其他类型的节点，在Python 3.8+中可能是Constant
-            if hasattr(ast, 'Constant') and isinstance(node, ast.Constant):
-                if isinstance(node.value, (int, float)):
-                    return node.value
-                raise ValueError("只支持数字常量")
             raise ValueError(f"不支持的表达式类型：{type(node)}")
 
-
 if __name__ == "__main__":
     tool = CalculatorTool()
     test_cases = ["2+2", "(3+5)*10", "2**10", "100/3", "10%3"]
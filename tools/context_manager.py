@@ -3,11 +3,24 @@
 标准工具实现，遵循 agent-learn 项目规范
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Deque, Dict, Any, List, Optional, Callable
+import functools
+import json
 import logging
+import time
+from array import array
+from collections import Counter, deque
+from itertools import islice
 from datetime import datetime
 from dataclasses import dataclass, asdict
 
+from utils.similarity import bigram_profile, cosine_similarity
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时使用标准库 json
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -15,38 +28,96 @@ class Message:
     """消息数据类"""
     role: str
     content: str
-    timestamp: datetime = None
+    timestamp_ns: int = 0
     task_id: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    tokens: int = 0
     
     def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.now()
+        # 创建时只记录整数纳秒时间戳，转换为 datetime 推迟到序列化时
+        if not self.timestamp_ns:
+            self.timestamp_ns = time.time_ns()
+        # 令牌数在创建时估算一次，之后统计和压缩直接读取
+        if not self.tokens:
+            self.tokens = _estimate_tokens(str(self.content))
+        if self.metadata is None:
+            self.metadata = {}
+    
+    @property
+    def timestamp(self) -> datetime:
+        """创建时间（兼容旧接口）"""
+        return datetime.fromtimestamp(self.timestamp_ns / 1e9)
+    
+    @functools.cached_property
+    def _iso_timestamp(self) -> str:
+        # 时间戳创建后不再变化，ISO 字符串首次序列化时生成一次
+        return self.timestamp.isoformat()
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             "role": self.role,
             "content": self.content,
-            "timestamp": self.timestamp.isoformat(),
+            "timestamp": self._iso_timestamp,
             "task_id": self.task_id,
-            "metadata": self.metadata or {}
+            "metadata": self.metadata
         }
+    
+    def to_openai_dict(self) -> Dict[str, Any]:
+        """只含角色和内容的轻量字典，不做时间戳序列化"""
+        return {"role": self.role, "content": self.content}
+
+def _estimate_tokens(text: str) -> int:
+    """估算文本的令牌数（按长度估算，O(1)；每条消息只在创建时计算一次）"""
+    return len(text) * 3 // 10
+
+
+def _default_summarizer(texts: List[str]) -> str:
+    """默认摘要：截取每段开头拼接（可替换为基于 LLM 的摘要函数）"""
+    return "；".join(text[:40] for text in texts)
+
 
 class ContextManager:
-    """上下文管理器 - 核心实现"""
+    """上下文管理器 - 核心实现
     
-    def __init__(self, max_tokens: int = 4000, compression_threshold: float = 0.8):
+    分层压缩：原始消息 → 一级摘要（每 chunk_size 条消息一段）→ 二级摘要（一级摘要超过
+    max_level1 段时合并）。只折叠最旧的稳定前缀，最近的消息保持原样。
+    compress_context 会先删除与后续消息高度重复的非用户消息，再按保留策略压缩。
+    summarizer 接收文本列表返回摘要，可传入如
+    ``lambda texts: client.chat_simple("\\n".join(texts), system_prompt=...)`` 的 LLM 摘要。
+    """
+    
+    def __init__(self, max_tokens: int = 4000, compression_threshold: float = 0.8,
+                 chunk_size: int = 10, max_level1: int = 5,
+                 summarizer: Optional[Callable[[List[str]], str]] = None,
+                 redundancy_threshold: float = 0.85, redundancy_window: int = 3):
         self.max_tokens = max_tokens
         self.compression_threshold = compression_threshold
-        self.messages: List[Message] = []
+        self.messages: Deque[Message] = deque()
+        # 与 messages 平行的逐条令牌数，压缩时按下标取用，无需重新估算
+        self._token_counts = array("l")
         self.token_count = 0
         self.compression_count = 0
+        self.chunk_size = chunk_size
+        self.max_level1 = max_level1
+        self.summarizer = summarizer or _default_summarizer
+        self.redundancy_threshold = redundancy_threshold
+        self.redundancy_window = redundancy_window
+        self._level1_buffer: deque = deque()
+        self._level2_summary: Optional[str] = None
+        # 角色/任务分布随增删增量维护，统计查询无需遍历消息
+        self._role_counts: Counter = Counter()
+        self._task_counts: Counter = Counter()
     
     def add_message(self, message: Message) -> None:
         """添加消息到上下文"""
+        tokens = self._count_tokens(message)
         self.messages.append(message)
-        self.token_count += self._count_tokens(message)
-        logger.debug(f"添加消息: {message.role}, 当前令牌数: {self.token_count}")
+        self._token_counts.append(tokens)
+        self.token_count += tokens
+        self._role_counts[message.role] += 1
+        if message.task_id:
+            self._task_counts[message.task_id] += 1
+        logger.debug("添加消息: %s, 当前令牌数: %d", message.role, self.token_count)
     
     def add_message_dict(self, message_dict: Dict[str, Any]) -> None:
         """添加字典格式的消息"""
@@ -63,7 +134,7 @@ class ContextManager:
         threshold_tokens = int(self.max_tokens * self.compression_threshold)
         needs_compression = self.token_count > threshold_tokens
         if needs_compression:
-            logger.info(f"触发压缩: {self.token_count} > {threshold_tokens} tokens")
+            logger.info("触发压缩: %d > %d tokens", self.token_count, threshold_tokens)
         return needs_compression
     
     def compress_context(self) -> Dict[str, Any]:
@@ -72,23 +143,17 @@ class ContextManager:
             return {"compressed": False, "reason": "无消息可压缩"}
         
         logger.info("开始执行上下文压缩...")
+        old_token_count = self.token_count
         
-        # 保留策略：用户消息 + 最近N条非用户消息
-        user_messages = [msg for msg in self.messages if msg.role == "user"]
-        non_user_messages = [msg for msg in self.messages if msg.role != "user"]
-        recent_non_user = non_user_messages[-5:] if len(non_user_messages) > 5 else non_user_messages
+        # 先去掉与后续消息高度重复的非用户消息
+        redundant_removed = self._prune_redundant()
         
-        # 重新组合并排序
-        compressed_messages = user_messages + recent_non_user
-        compressed_messages.sort(key=lambda x: x.timestamp)
+        # 保留策略：用户消息 + 最近N条非用户消息（按下标在原顺序上删除，无需重新排序）
+        non_user_idx = [i for i, msg in enumerate(self.messages) if msg.role != "user"]
+        dropped = non_user_idx[:-5]
+        self._drop_indices(set(dropped))
         
-        # 计算压缩效果
-        old_token_count = self.token_count
-        new_token_count = sum(self._count_tokens(msg) for msg in compressed_messages)
-        
-        # 更新状态
-        self.messages = compressed_messages
-        self.token_count = new_token_count
+        new_token_count = self.token_count
         self.compression_count += 1
         
         compression_stats = {
@@ -96,54 +161,175 @@ class ContextManager:
             "original_tokens": old_token_count,
             "compressed_tokens": new_token_count,
             "compression_ratio": round((old_token_count - new_token_count) / old_token_count, 3),
-            "messages_removed": len(non_user_messages) - len(recent_non_user),
+            "messages_removed": len(dropped) + redundant_removed,
+            "redundant_removed": redundant_removed,
             "compression_count": self.compression_count
         }
         
-        logger.info(f"压缩完成: {old_token_count} → {new_token_count} tokens "
-                   f"(压缩率: {compression_stats['compression_ratio']*100:.1f}%)")
+        logger.info("压缩完成: %d → %d tokens (压缩率: %.1f%%)",
+                    old_token_count, new_token_count, compression_stats["compression_ratio"] * 100)
         
         return compression_stats
     
-    def get_context_stats(self) -> Dict[str, Any]:
-        """获取上下文统计信息"""
-        role_counts = {}
-        task_counts = {}
+    def _prune_redundant(self) -> int:
+        """
+        删除冗余消息：非用户消息与其后 redundancy_window 条消息中任一条的
+        字符二元组余弦相似度超过 redundancy_threshold 时，只保留较新的那条
+        
+        Returns:
+            删除的消息数
+        """
+        profiles = [bigram_profile(str(msg.content)) for msg in self.messages]
+        dropped = set()
+        for i, msg in enumerate(self.messages):
+            if msg.role != "user":
+                later = profiles[i + 1:i + 1 + self.redundancy_window]
+                if any(cosine_similarity(profiles[i], other) > self.redundancy_threshold for other in later):
+                    dropped.add(i)
+        
+        if dropped:
+            self._drop_indices(dropped)
+            logger.info("删除冗余消息 %d 条", len(dropped))
+        return len(dropped)
+    
+    def _drop_indices(self, dropped: set) -> None:
+        """按下标删除消息，同步维护令牌数组、令牌总数与分布计数"""
+        if not dropped:
+            return
+        # 一次遍历：保留的消息原样留下，删除的消息从令牌总数中扣减，无需对保留部分重新求和
+        kept_messages: Deque[Message] = deque()
+        kept_counts = array("l")
+        removed_tokens = 0
+        for i, (msg, tokens) in enumerate(zip(self.messages, self._token_counts)):
+            if i in dropped:
+                removed_tokens += tokens
+                self._forget_counts(msg)
+            else:
+                kept_messages.append(msg)
+                kept_counts.append(tokens)
+        self.messages = kept_messages
+        self._token_counts = kept_counts
+        self.token_count -= removed_tokens
+    
+    def should_summarize(self) -> bool:
+        """判断原始消息是否超过分块大小，需要分层压缩"""
+        return len(self.messages) > self.chunk_size
+    
+    def summarize_context(self) -> Dict[str, Any]:
+        """执行分层压缩"""
+        if not self.should_summarize():
+            return {"summarized": False, "reason": "原始消息未超过分块大小"}
+        
+        old_token_count = self.token_count + self._summary_tokens()
+        folded = 0
+        
+        # 最旧的整块原始消息折叠为一级摘要，保留不足一块的尾部
+        while len(self.messages) > self.chunk_size:
+            chunk = [self.messages.popleft() for _ in range(self.chunk_size)]
+            self.token_count -= sum(self._token_counts[:self.chunk_size])
+            del self._token_counts[:self.chunk_size]
+            for msg in chunk:
+                self._forget_counts(msg)
+            self._level1_buffer.append(
+                self.summarizer([f"[{msg.role}] {msg.content}" for msg in chunk])
+            )
+            folded += len(chunk)
         
-        for msg in self.messages:
-            role_counts[msg.role] = role_counts.get(msg.role, 0) + 1
-            if msg.task_id:
-                task_counts[msg.task_id] = task_counts.get(msg.task_id, 0) + 1
+        # 一级摘要过多时合并进二级摘要
+        merged = 0
+        if len(self._level1_buffer) > self.max_level1:
+            parts = list(self._level1_buffer)
+            if self._level2_summary:
+                parts.insert(0, self._level2_summary)
+            self._level2_summary = self.summarizer(parts)
+            merged = len(self._level1_buffer)
+            self._level1_buffer.clear()
+        
+        new_token_count = self.token_count + self._summary_tokens()
+        logger.info("分层压缩完成: 折叠 %d 条消息, 合并 %d 段一级摘要", folded, merged)
         
+        return {
+            "summarized": True,
+            "messages_folded": folded,
+            "level1_merged": merged,
+            "level1_summaries": len(self._level1_buffer),
+            "has_level2_summary": self._level2_summary is not None,
+            "original_tokens": old_token_count,
+            "compressed_tokens": new_token_count
+        }
+    
+    def get_context_stats(self) -> Dict[str, Any]:
+        """获取上下文统计信息"""
         return {
             "total_messages": len(self.messages),
             "total_tokens": self.token_count,
             "max_tokens": self.max_tokens,
             "compression_threshold": self.compression_threshold,
             "compression_count": self.compression_count,
-            "role_distribution": role_counts,
-            "task_distribution": task_counts,
-            "utilization_rate": round(self.token_count / self.max_tokens, 3)
+            "role_distribution": dict(self._role_counts),
+            "task_distribution": dict(self._task_counts),
+            "utilization_rate": round(self.token_count / self.max_tokens, 3),
+            "level1_summaries": len(self._level1_buffer),
+            "has_level2_summary": self._level2_summary is not None,
+            "summary_tokens": self._summary_tokens()
         }
     
-    def get_recent_messages(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """获取最近的消息"""
-        recent = self.messages[-limit:] if len(self.messages) > limit else self.messages
-        return [msg.to_dict() for msg in recent]
+    def get_recent_messages(self, limit: int = 10, full: bool = False) -> List[Dict[str, Any]]:
+        """获取最近的消息，默认只含角色和内容，full=True 时包含时间戳、任务和元数据"""
+        # 只迭代尾部，不复制消息列表
+        recent = islice(self.messages, max(0, len(self.messages) - limit), None)
+        if full:
+            return [msg.to_dict() for msg in recent]
+        return [msg.to_openai_dict() for msg in recent]
     
     def clear_context(self) -> None:
         """清空上下文"""
         self.messages.clear()
+        del self._token_counts[:]
         self.token_count = 0
+        self._level1_buffer.clear()
+        self._level2_summary = None
+        self._role_counts.clear()
+        self._task_counts.clear()
         logger.info("上下文已清空")
     
+    def _forget_counts(self, message: Message) -> None:
+        """消息移出上下文时同步扣减分布计数"""
+        self._role_counts[message.role] -= 1
+        if not self._role_counts[message.role]:
+            del self._role_counts[message.role]
+        if message.task_id:
+            self._task_counts[message.task_id] -= 1
+            if not self._task_counts[message.task_id]:
+                del self._task_counts[message.task_id]
+    
     def _count_tokens(self, message: Message) -> int:
-        """估算消息的令牌数"""
-        return int(len(str(message.content)) * 0.3)
+        """消息的令牌数（创建消息时已估算）"""
+        return message.tokens
+    
+    def _summary_tokens(self) -> int:
+        """各级摘要的令牌数"""
+        total = sum(_estimate_tokens(summary) for summary in self._level1_buffer)
+        if self._level2_summary:
+            total += _estimate_tokens(self._level2_summary)
+        return total
     
     def to_openai_format(self) -> List[Dict[str, Any]]:
-        """转换为 OpenAI API 格式"""
-        return [{"role": msg.role, "content": msg.content} for msg in self.messages]
+        """转换为 OpenAI API 格式：[二级摘要, *一级摘要, *原始消息]"""
+        result = []
+        if self._level2_summary:
+            result.append({"role": "system", "content": f"早期对话摘要：{self._level2_summary}"})
+        for summary in self._level1_buffer:
+            result.append({"role": "system", "content": f"对话摘要：{summary}"})
+        result.extend({"role": msg.role, "content": msg.content} for msg in self.messages)
+        return result
+    
+    def to_openai_json(self) -> bytes:
+        """直接序列化为 OpenAI 消息列表的 JSON 字节串（优先使用 orjson）"""
+        messages = self.to_openai_format()
+        if orjson is not None:
+            return orjson.dumps(messages)
+        return json.dumps(messages, ensure_ascii=False).encode("utf-8")
 
 class ContextManagerTool:
     """上下文管理工具 - 标准工具接口"""
@@ -155,31 +341,34 @@ class ContextManagerTool:
     def __init__(self):
         self.context_manager = ContextManager()
     
-    def to_openai_format(self) -> Dict[str, Any]:
-        """转换为 OpenAI 工具格式"""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "action": {
-                            "type": "string",
-                            "enum": ["monitor", "compress", "stats", "clear", "recent"],
-                            "description": "要执行的操作类型"
-                        },
-                        "limit": {
-                            "type": "integer",
-                            "description": "获取最近消息的数量（仅在action='recent'时使用）",
-                            "default": 5
-                        }
+    # OpenAI 工具格式定义在类定义时构建一次，所有实例共享
+    _OPENAI_FORMAT = {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "action": {
+                        "type": "string",
+                        "enum": ["monitor", "compress", "summarize", "stats", "clear", "recent"],
+                        "description": "要执行的操作类型"
                     },
-                    "required": ["action"]
-                }
+                    "limit": {
+                        "type": "integer",
+                        "description": "获取最近消息的数量（仅在action='recent'时使用）",
+                        "default": 5
+                    }
+                },
+                "required": ["action"]
             }
         }
+    }
+    
+    def to_openai_format(self) -> Dict[str, Any]:
+        """转换为 OpenAI 工具格式"""
+        return self._OPENAI_FORMAT
     
     def execute(self, action: str, limit: int = 5) -> Dict[str, Any]:
         """执行上下文管理操作"""
@@ -208,6 +397,17 @@ class ContextManagerTool:
                         "data": {"compressed": False, "reason": "上下文未达到压缩阈值"},
                         "message": "上下文使用率较低，无需压缩"
                     }
+            elif action == "summarize":
+                result = cm.summarize_context()
+                if result["summarized"]:
+                    message = f"分层压缩完成，折叠了 {result['messages_folded']} 条早期消息"
+                else:
+                    message = "原始消息较少，无需分层压缩"
+                return {
+                    "success": True,
+                    "data": result,
+                    "message": message
+                }
             elif action == "stats":
                 return {
                     "success": True,
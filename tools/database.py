@@ -7,7 +7,10 @@ import sqlite3
 import re
 import os
 import logging
-from typing import Dict, Any, List, Optional
+import queue
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +20,12 @@ DB_PATH = os.path.join(
     "sample.db"
 )
 
+# 只读连接池：查询时借出一个空闲连接，用完归还，并发查询互不阻塞
+# 连接内置按 SQL 文本缓存的预编译语句，重复查询跳过解析和查询规划
+_STATEMENT_CACHE_SIZE = 256
+_POOL_SIZE = 4
+_pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=_POOL_SIZE)
+
 SCHEMA = """
 ## 数据库表结构
 
@@ -47,6 +56,60 @@ SCHEMA = """
 """
 
 
+def _open_connection() -> sqlite3.Connection:
+    """打开一个只读数据库连接"""
+    conn = sqlite3.connect(
+        f"{Path(DB_PATH).as_uri()}?mode=ro", uri=True, check_same_thread=False,
+        cached_statements=_STATEMENT_CACHE_SIZE
+    )
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-64000")
+    return conn
+
+
+@contextmanager
+def _connection() -> Iterator[sqlite3.Connection]:
+    """从连接池借出连接，池中没有空闲连接时新建；归还时池已满则关闭"""
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+    try:
+        yield conn
+    finally:
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def close_connections() -> None:
+    """关闭连接池中的所有空闲连接"""
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            break
+
+
+# SQL 白名单关键字和禁止模式，模块级不可变常量
+_ALLOWED_KEYWORDS = frozenset((
+    "SELECT", "FROM", "WHERE", "AND", "OR", "NOT", "IN", "LIKE",
+    "ORDER BY", "ASC", "DESC", "LIMIT", "OFFSET", "GROUP BY",
+    "HAVING", "COUNT", "SUM", "AVG", "MAX", "MIN", "AS", "ON",
+    "JOIN", "LEFT JOIN", "RIGHT JOIN", "INNER JOIN", "OUTER JOIN",
+    "DISTINCT", "BETWEEN", "IS NULL", "IS NOT NULL", "CASE", "WHEN",
+    "THEN", "ELSE", "END", "UNION", "EXISTS"
+))
+
+_FORBIDDEN_PATTERNS = (
+    r"\bINSERT\b", r"\bUPDATE\b", r"\bDELETE\b", r"\bDROP\b",
+    r"\bCREATE\b", r"\bALTER\b", r"\bTRUNCATE\b", r"\bGRANT\b",
+    r"\bREVOKE\b", r"\bEXEC\b", r"\bEXECUTE\b", r"\b--", r";.*;"
+)
+
+
 class DatabaseTool:
     """数据库查询工具"""
     
@@ -54,40 +117,38 @@ class DatabaseTool:
     name = "execute_sql"
     description = "执行 SQL 查询数据库。只支持 SELECT 查询，用于回答用户关于数据库数据的问题。"
     
-    ALLOWED_KEYWORDS = [
-        "SELECT", "FROM", "WHERE", "AND", "OR", "NOT", "IN", "LIKE",
-        "ORDER BY", "ASC", "DESC", "LIMIT", "OFFSET", "GROUP BY",
-        "HAVING", "COUNT", "SUM", "AVG", "MAX", "MIN", "AS", "ON",
-        "JOIN", "LEFT JOIN", "RIGHT JOIN", "INNER JOIN", "OUTER JOIN",
-        "DISTINCT", "BETWEEN", "IS NULL", "IS NOT NULL", "CASE", "WHEN",
-        "THEN", "ELSE", "END", "UNION", "EXISTS"
-    ]
+    # 单次查询最多返回的行数，超出部分截断，避免大结果集占满内存和上下文
+    MAX_ROWS = 1000
     
-    FORBIDDEN_PATTERNS = [
-        r"\bINSERT\b", r"\bUPDATE\b", r"\bDELETE\b", r"\bDROP\b",
-        r"\bCREATE\b", r"\bALTER\b", r"\bTRUNCATE\b", r"\bGRANT\b",
-        r"\bREVOKE\b", r"\bEXEC\b", r"\bEXECUTE\b", r"\b--", r";.*;"
-    ]
+    ALLOWED_KEYWORDS = _ALLOWED_KEYWORDS
+    FORBIDDEN_PATTERNS = _FORBIDDEN_PATTERNS
     
-    def to_openai_format(self) -> Dict[str, Any]:
-        """转换为 OpenAI 工具格式"""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "sql": {
-                            "type": "string",
-                            "description": "要执行的 SQL 查询语句（只支持 SELECT）"
-                        }
-                    },
-                    "required": ["sql"]
-                }
+    # 禁止模式合并为一个正则，忽略大小写匹配，一次扫描完成检查
+    _FORBIDDEN_RE = re.compile("|".join(_FORBIDDEN_PATTERNS), re.IGNORECASE)
+    _SELECT_RE = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+    
+    # OpenAI 工具格式定义在类定义时构建一次，所有实例共享
+    _OPENAI_FORMAT = {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "sql": {
+                        "type": "string",
+                        "description": "要执行的 SQL 查询语句（只支持 SELECT）"
+                    }
+                },
+                "required": ["sql"]
             }
         }
+    }
+    
+    def to_openai_format(self) -> Dict[str, Any]:
+        """转换为 OpenAI 工具格式"""
+        return self._OPENAI_FORMAT
     
     def execute(self, sql: str) -> Dict[str, Any]:
         """
@@ -109,32 +170,28 @@ class DatabaseTool:
                 "error": validation_result["error"]
             }
         
-        # 规范化 SQL（移除多余空格转为小写用于检查）
-        sql_lower = sql.lower()
-        
         # 执行查询
         try:
-            conn = sqlite3.connect(DB_PATH)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute(sql)
-            rows = cursor.fetchall()
-            
-            # 转换为字典列表
-            results = []
-            for row in rows:
-                results.append(dict(row))
+            # 多取一行用于判断是否超出上限，常见的小结果集一块取完
+            with closing(self._iter_chunks(sql, self.MAX_ROWS + 1)) as chunks:
+                chunk = next(chunks, None)
+            columns = chunk["columns"] if chunk else []
+            rows = chunk["rows"] if chunk else []
             
-            conn.close()
+            # 列名只取一次，逐行与列名组合为字典
+            truncated = len(rows) > self.MAX_ROWS
+            results = [dict(zip(columns, row)) for row in rows[:self.MAX_ROWS]]
             
-            logger.info(f"SQL 查询成功，返回 {len(results)} 条记录")
+            if truncated:
+                logger.warning("SQL 查询结果超过 %d 行，已截断", self.MAX_ROWS)
+            logger.info("SQL 查询成功，返回 %d 条记录", len(results))
             
             return {
                 "success": True,
                 "data": {
                     "row_count": len(results),
-                    "results": results
+                    "results": results,
+                    "truncated": truncated
                 }
             }
             
@@ -151,20 +208,52 @@ class DatabaseTool:
                 "error": f"查询失败: {str(e)}"
             }
     
+    def execute_stream(self, sql: str, chunk_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        流式执行 SQL 查询，按块返回结果，不受 MAX_ROWS 限制
+        
+        Args:
+            sql: SQL 查询语句
+            chunk_size: 每块的行数
+        
+        Returns:
+            结果块迭代器，每块为 {"columns": 列名列表, "rows": 行元组列表}
+        
+        Raises:
+            ValueError: SQL 未通过安全验证
+        """
+        sql = sql.strip()
+        validation_result = self._validate_sql(sql)
+        if not validation_result["valid"]:
+            raise ValueError(validation_result["error"])
+        # 普通函数先完成验证再返回生成器，非法 SQL 在调用时即抛出异常
+        return self._iter_chunks(sql, chunk_size)
+    
+    def _iter_chunks(self, sql: str, chunk_size: int) -> Iterator[Dict[str, Any]]:
+        """逐块读取游标，迭代期间占用一个连接，结束或关闭迭代器时归还"""
+        with _connection() as conn:
+            cursor = conn.execute(sql)
+            try:
+                columns = [column[0] for column in cursor.description]
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield {"columns": columns, "rows": rows}
+            finally:
+                cursor.close()
+    
     def _validate_sql(self, sql: str) -> Dict[str, Any]:
         """验证 SQL 安全性"""
-        sql_upper = sql.upper()
-        
         # 检查禁止的模式
-        for pattern in self.FORBIDDEN_PATTERNS:
-            if re.search(pattern, sql_upper):
-                return {
-                    "valid": False,
-                    "error": f"不支持的 SQL 操作: 检测到禁止的关键词"
-                }
+        if self._FORBIDDEN_RE.search(sql):
+            return {
+                "valid": False,
+                "error": f"不支持的 SQL 操作: 检测到禁止的关键词"
+            }
         
         # 确保是 SELECT 语句
-        if not sql_upper.strip().startswith("SELECT"):
+        if not self._SELECT_RE.match(sql):
             return {
                 "valid": False,
                 "error": "只支持 SELECT 查询语句"
@@ -172,6 +261,10 @@ class DatabaseTool:
         
         return {"valid": True}
     
+    def close(self) -> None:
+        """关闭数据库连接"""
+        close_connections()
+    
     def get_schema(self) -> str:
         """获取数据库 Schema"""
         return SCHEMA
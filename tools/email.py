@@ -7,9 +7,16 @@ from typing import Dict, Any, Optional
 import logging
 import re
 from datetime import datetime
+from uuid import uuid4
+
+from utils.validators import EMAIL_RE
 
 logger = logging.getLogger(__name__)
 
+# 敏感关键词合并为一个正则，正文只扫描一遍
+SENSITIVE_KEYWORDS = ("密码", "银行卡", "身份证", "信用卡", "cvv")
+_SENSITIVE_RE = re.compile("|".join(map(re.escape, SENSITIVE_KEYWORDS)))
+
 class EmailTool:
     """邮件发送工具"""
     
@@ -18,37 +25,40 @@ class EmailTool:
     description = "发送邮件到指定邮箱地址。用于发送通知、提醒、报告等。需要收件人邮箱、主题和正文。"
     require_confirmation = True  # 敏感操作需要确认
     
-    def to_openai_format(self) -> Dict[str, Any]:
-        """转换为 OpenAI 工具格式"""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "to": {
-                            "type": "string",
-                            "description": "收件人邮箱地址"
-                        },
-                        "subject": {
-                            "type": "string",
-                            "description": "邮件主题，不超过100字符"
-                        },
-                        "body": {
-                            "type": "string",
-                            "description": "邮件正文内容"
-                        },
-                        "cc": {
-                            "type": "string",
-                            "description": "抄送邮箱地址，可选"
-                        }
+    # OpenAI 工具格式定义在类定义时构建一次，所有实例共享
+    _OPENAI_FORMAT = {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "to": {
+                        "type": "string",
+                        "description": "收件人邮箱地址"
                     },
-                    "required": ["to", "subject", "body"]
-                }
+                    "subject": {
+                        "type": "string",
+                        "description": "邮件主题，不超过100字符"
+                    },
+                    "body": {
+                        "type": "string",
+                        "description": "邮件正文内容"
+                    },
+                    "cc": {
+                        "type": "string",
+                        "description": "抄送邮箱地址，可选"
+                    }
+                },
+                "required": ["to", "subject", "body"]
             }
         }
+    }
+    
+    def to_openai_format(self) -> Dict[str, Any]:
+        """转换为 OpenAI 工具格式"""
+        return self._OPENAI_FORMAT
     
     def execute(self, to: str, subject: str, body: str, cc: Optional[str] = None) -> Dict[str, Any]:
         """执行邮件发送"""
@@ -82,7 +92,7 @@ class EmailTool:
             
             # 敏感内容检查
             if self._contains_sensitive_content(body):
-                logger.warning(f"邮件包含敏感内容，已拦截：{to}")
+                logger.warning("邮件包含敏感内容，已拦截：%s", to)
                 return {
                     "success": False,
                     "error": "邮件内容包含敏感信息，发送失败"
@@ -91,7 +101,7 @@ class EmailTool:
             # 模拟发送（实际项目替换为真实SMTP或邮件API）
             email_id = self._send_email_mock(to, subject, body, cc)
             
-            logger.info(f"邮件发送成功：{to}, 主题：{subject}")
+            logger.info("邮件发送成功：%s, 主题：%s", to, subject)
             return {
                 "success": True,
                 "data": {
@@ -111,19 +121,16 @@ class EmailTool:
     
     def _is_valid_email(self, email: str) -> bool:
         """验证邮箱格式"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return EMAIL_RE.match(email) is not None
     
     def _contains_sensitive_content(self, content: str) -> bool:
         """检查敏感内容"""
-        sensitive_keywords = ["密码", "银行卡", "身份证", "信用卡", "cvv"]
-        return any(keyword in content for keyword in sensitive_keywords)
+        return _SENSITIVE_RE.search(content) is not None
     
     def _send_email_mock(self, to: str, subject: str, body: str, cc: Optional[str] = None) -> str:
         """模拟邮件发送"""
-        import uuid
         # 实际项目中使用 smtplib 或 SendGrid/Mailgun 等API
-        return str(uuid.uuid4())
+        return str(uuid4())
 
 
 if __name__ == "__main__":
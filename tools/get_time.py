@@ -3,12 +3,37 @@
 获取当前时间和日期
 """
 
+from types import MappingProxyType
 from typing import Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import functools
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 与 strftime("%A") 相同的英文星期名，按 weekday() 下标取用，跳过区域设置查询
+_WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# 城市名到时区的映射（只读）
+_TIMEZONES = MappingProxyType({
+    "北京": "Asia/Shanghai",
+    "上海": "Asia/Shanghai",
+    "东京": "Asia/Tokyo",
+    "纽约": "America/New_York",
+    "伦敦": "Europe/London",
+    "巴黎": "Europe/Paris",
+    "悉尼": "Australia/Sydney",
+    "洛杉矶": "America/Los_Angeles",
+})
+
+
+@functools.lru_cache(maxsize=64)
+def _tz(name: str) -> tzinfo:
+    """获取时区对象（按名称缓存，避免重复解析时区数据文件）"""
+    return ZoneInfo(name)
+
+
 class TimeTool:
     """时间查询工具"""
     
@@ -17,49 +42,50 @@ class TimeTool:
     description = "获取当前时间和日期。支持指定时区。当用户询问时间、日期、时区转换时使用。"
     
     # 常用时区映射
-    TIMEZONES = {
-        "北京": "Asia/Shanghai",
-        "上海": "Asia/Shanghai",
-        "东京": "Asia/Tokyo",
-        "纽约": "America/New_York",
-        "伦敦": "Europe/London",
-        "巴黎": "Europe/Paris",
-        "悉尼": "Australia/Sydney",
-        "洛杉矶": "America/Los_Angeles",
-    }
+    TIMEZONES = _TIMEZONES
     
-    def to_openai_format(self) -> Dict[str, Any]:
-        """转换为 OpenAI 工具格式"""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "timezone": {
-                            "type": "string",
-                            "description": "时区名称，如'Asia/Shanghai'、'America/New_York'，或城市名如'北京'、'纽约'"
-                        },
-                        "format": {
-                            "type": "string",
-                            "enum": ["full", "date_only", "time_only"],
-                            "description": "返回格式，默认full"
-                        }
+    # OpenAI 工具格式定义在类定义时构建一次，所有实例共享
+    _OPENAI_FORMAT = {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "timezone": {
+                        "type": "string",
+                        "description": "时区名称，如'Asia/Shanghai'、'America/New_York'，或城市名如'北京'、'纽约'"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["full", "date_only", "time_only"],
+                        "description": "返回格式，默认full"
                     }
                 }
             }
         }
+    }
+    
+    def to_openai_format(self) -> Dict[str, Any]:
+        """转换为 OpenAI 工具格式"""
+        return self._OPENAI_FORMAT
     
     def execute(self, timezone: Optional[str] = None, format: str = "full") -> Dict[str, Any]:
         """获取当前时间"""
         try:
             # 解析时区
             tz_string = self._resolve_timezone(timezone)
+            try:
+                tz = _tz(tz_string)
+            except (ZoneInfoNotFoundError, ValueError):
+                return {
+                    "success": False,
+                    "error": f"未知时区：{tz_string}"
+                }
             
-            # 获取时间
-            now = datetime.now()
+            # 获取指定时区的当前时间
+            now = datetime.now(tz)
             
             # 格式化输出
             if format == "date_only":
@@ -75,7 +101,7 @@ class TimeTool:
                     "datetime": time_str,
                     "timezone": tz_string,
                     "timestamp": now.timestamp(),
-                    "weekday": now.strftime("%A")
+                    "weekday": _WEEKDAY_NAMES[now.weekday()]
                 }
             }
             
@@ -3,13 +3,45 @@
 调用真实天气API获取天气信息
 """
 
+import re
 import requests
-from typing import Optional, Dict, Any
+from random import choice, randint
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 模拟天气数据的取值范围
+_MOCK_CONDITIONS = ("晴", "多云", "阴", "小雨", "中雨", "大雨", "雪")
+_MOCK_WIND_DIRECTIONS = ("东风", "南风", "西风", "北风")
+
+# 城市代码映射，只读视图防止运行时被意外修改
+_CITY_CODES = MappingProxyType({
+    "北京": "101010100",
+    "上海": "101020100",
+    "广州": "101280100",
+    "深圳": "101280600",
+    "杭州": "101210101",
+    "成都": "101270101",
+    "武汉": "101200101",
+    "西安": "101110101",
+    "南京": "101190101",
+    "重庆": "101040100",
+})
+
+
+def _build_city_index(city_codes: Mapping[str, str]) -> Dict[str, str]:
+    """把每个城市名的所有子串映射到城市名，同一子串以先出现的城市为准"""
+    index: Dict[str, str] = {}
+    for city in city_codes:
+        for start in range(len(city)):
+            for end in range(start + 1, len(city) + 1):
+                index.setdefault(city[start:end], city)
+    return index
+
+
 class WeatherTool:
     """天气查询工具"""
     
@@ -18,47 +50,44 @@ class WeatherTool:
     description = "获取指定城市在特定日期的天气信息，包括温度、降水概率、风速等。当用户询问天气、是否需要带伞、适合穿什么衣服时使用。"
     
     # 城市代码映射（实际项目应从数据库或API获取）
-    CITY_CODES = {
-        "北京": "101010100",
-        "上海": "101020100",
-        "广州": "101280100",
-        "深圳": "101280600",
-        "杭州": "101210101",
-        "成都": "101270101",
-        "武汉": "101200101",
-        "西安": "101110101",
-        "南京": "101190101",
-        "重庆": "101040100",
-    }
+    CITY_CODES = _CITY_CODES
     
-    def to_openai_format(self) -> Dict[str, Any]:
-        """转换为 OpenAI 工具格式"""
-        return {
-            "type": "function",
-            "function": {
-                "name": self.name,
-                "description": self.description,
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "location": {
-                            "type": "string",
-                            "description": "城市名称，如'北京'、'上海'、'广州'"
-                        },
-                        "date": {
-                            "type": "string",
-                            "description": "日期，格式YYYY-MM-DD。不传则查询今天"
-                        },
-                        "unit": {
-                            "type": "string",
-                            "enum": ["celsius", "fahrenheit"],
-                            "description": "温度单位，默认celsius"
-                        }
+    # 模糊匹配索引：输入是城市名的一部分时查子串表，输入包含城市名时用合并正则一次扫描
+    _CITY_INDEX = _build_city_index(CITY_CODES)
+    _CITY_ORDER = {city: i for i, city in enumerate(CITY_CODES)}
+    _CITY_RE = re.compile("|".join(map(re.escape, CITY_CODES)))
+    
+    # OpenAI 工具格式定义在类定义时构建一次，所有实例共享
+    _OPENAI_FORMAT = {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "location": {
+                        "type": "string",
+                        "description": "城市名称，如'北京'、'上海'、'广州'"
                     },
-                    "required": ["location"]
-                }
+                    "date": {
+                        "type": "string",
+                        "description": "日期，格式YYYY-MM-DD。不传则查询今天"
+                    },
+                    "unit": {
+                        "type": "string",
+                        "enum": ["celsius", "fahrenheit"],
+                        "description": "温度单位，默认celsius"
+                    }
+                },
+                "required": ["location"]
             }
         }
+    }
+    
+    def to_openai_format(self) -> Dict[str, Any]:
+        """转换为 OpenAI 工具格式"""
+        return self._OPENAI_FORMAT
     
     def execute(self, location: str, date: Optional[str] = None, unit: str = "celsius") -> Dict[str, Any]:
         """执行天气查询"""
@@ -67,11 +96,10 @@ class WeatherTool:
             city_code = self.CITY_CODES.get(location)
             if not city_code:
                 # 尝试模糊匹配
-                for city, code in self.CITY_CODES.items():
-                    if location in city or city in location:
-                        city_code = code
-                        location = city
-                        break
+                city = self._match_city(location)
+                if city:
+                    city_code = self.CITY_CODES[city]
+                    location = city
             
             if not city_code:
                 return {
@@ -90,7 +118,7 @@ class WeatherTool:
             else:
                 weather_data["unit"] = "°C"
             
-            logger.info(f"天气查询成功：{location}, {weather_data.get('temperature')}")
+            logger.info("天气查询成功：%s, %s", location, weather_data.get("temperature"))
             return {
                 "success": True,
                 "data": weather_data
@@ -103,21 +131,26 @@ class WeatherTool:
                 "error": str(e)
             }
     
+    def _match_city(self, location: str) -> Optional[str]:
+        """模糊匹配城市名：先查输入是否为某城市名的一部分，再查输入中包含的城市名"""
+        city = self._CITY_INDEX.get(location)
+        if city:
+            return city
+        # 输入中包含多个城市名时取 CITY_CODES 中靠前的
+        return min(self._CITY_RE.findall(location), key=self._CITY_ORDER.__getitem__, default=None)
+    
     def _mock_weather_api(self, city_code: str, date: Optional[str] = None) -> Dict[str, Any]:
         """模拟天气API（实际项目替换为真实调用）"""
-        import random
-        
         # 模拟数据
-        conditions = ["晴", "多云", "阴", "小雨", "中雨", "大雨", "雪"]
         return {
             "location": city_code,
             "date": date or datetime.now().strftime("%Y-%m-%d"),
-            "temperature": random.randint(15, 35),
-            "condition": random.choice(conditions),
-            "humidity": random.randint(40, 90),
-            "wind_speed": random.randint(1, 20),
-            "wind_direction": random.choice(["东风", "南风", "西风", "北风"]),
-            "aqi": random.randint(30, 200),
+            "temperature": randint(15, 35),
+            "condition": choice(_MOCK_CONDITIONS),
+            "humidity": randint(40, 90),
+            "wind_speed": randint(1, 20),
+            "wind_direction": choice(_MOCK_WIND_DIRECTIONS),
+            "aqi": randint(30, 200),
         }
 
 
@@ -2,8 +2,10 @@
 工具模块初始化
 """
 
-from .validators import validate_tool_call
+from .validators import ErrCode, validate_tool_call, validate_tool_calls, invalidate_validator_cache
 from .rate_limiter import RateLimiter
 from .logger import setup_logging
+from .similarity import bigram_profile, cosine_similarity
+from .json_extract import extract_json_object
 
-__all__ = ["validate_tool_call", "RateLimiter", "setup_logging"]
+__all__ = ["ErrCode", "validate_tool_call", "validate_tool_calls", "invalidate_validator_cache", "RateLimiter", "setup_logging", "bigram_profile", "cosine_similarity", "extract_json_object"]
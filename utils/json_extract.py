@@ -0,0 +1,27 @@
+"""
+LLM 输出中的 JSON 提取工具
+"""
+
+import json
+from typing import Any, Dict
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def extract_json_object(content: str) -> Dict[str, Any]:
+    """
+    从 LLM 输出中提取第一个完整的 JSON 对象，忽略前后的说明文字和代码块标记
+    
+    Raises:
+        ValueError: 输出中没有可解析的 JSON 对象
+    """
+    start = content.find("{")
+    while start != -1:
+        try:
+            # 从 "{" 起一次解析出完整对象，其后的多余文本不再扫描
+            obj, _ = _JSON_DECODER.raw_decode(content, start)
+            return obj
+        except json.JSONDecodeError:
+            # 说明文字中的花括号不是 JSON 起点，从下一个 "{" 重试
+            start = content.find("{", start + 1)
+    raise ValueError("LLM 输出中未找到 JSON 对象")
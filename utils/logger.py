@@ -2,9 +2,12 @@
 日志配置
 """
 
+import atexit
 import logging
 import os
+import queue
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
 def setup_logging(log_level: str = "INFO", log_file: str = None):
     """配置日志"""
@@ -32,12 +35,18 @@ def setup_logging(log_level: str = "INFO", log_file: str = None):
     logger.setLevel(getattr(logging, log_level.upper()))
     logger.addHandler(console_handler)
     
-    # 文件处理器
+    # 文件处理器：写文件放到后台线程，记录日志的线程只需入队，不被磁盘 I/O 阻塞
+    # 控制台仍同步输出，保证与 print 的先后顺序
     if log_file:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_path = os.path.join(logs_dir, f"{log_file}_{timestamp}.log")
         file_handler = logging.FileHandler(log_path)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+        # 退出时写完队列中剩余的日志
+        atexit.register(listener.stop)
+        logger.addHandler(QueueHandler(log_queue))
     
     return logger
\ No newline at end of file
@@ -5,36 +5,40 @@
 
 import time
 import threading
-from collections import deque
 
 class RateLimiter:
-    """令牌桶速率限制器"""
+    """令牌桶速率限制器（GCRA 实现，只需维护一个时间戳）"""
     
-    def __init__(self, limit_per_minute: int = 60):
+    def __init__(self, limit_per_minute: int = 60, burst: int = 1):
+        """
+        Args:
+            limit_per_minute: 每分钟允许的调用次数
+            burst: 空闲后允许连续调用而不等待的次数，默认 1 即严格按间隔
+        """
         self.limit = limit_per_minute
         self.interval = 60.0 / limit_per_minute  # 每次请求的最小间隔
-        self.last_call = 0
+        self._burst_window = (max(1, burst) - 1) * self.interval  # 可提前透支的时长
+        self._next_ts = 0.0  # 下一次允许调用的理论时刻（monotonic 时钟）
         self.lock = threading.Lock()
     
     def acquire(self):
         """获取令牌，如果超限则等待"""
+        # 锁内只预约时间槽，等待放到锁外，未超限时不产生 sleep 调用
         with self.lock:
-            now = time.time()
-            time_since_last = now - self.last_call
-            
-            if time_since_last < self.interval:
-                wait_time = self.interval - time_since_last
-                time.sleep(wait_time)
-            
-            self.last_call = time.time()
+            now = time.monotonic()
+            slot = max(now, self._next_ts)
+            wait_time = slot - self._burst_window - now
+            self._next_ts = slot + self.interval
+        
+        if wait_time > 0:
+            time.sleep(wait_time)
     
     def try_acquire(self) -> bool:
         """尝试获取令牌，不等待"""
         with self.lock:
-            now = time.time()
-            time_since_last = now - self.last_call
-            
-            if time_since_last >= self.interval:
-                self.last_call = now
+            now = time.monotonic()
+            slot = max(now, self._next_ts)
+            if slot - self._burst_window <= now:
+                self._next_ts = slot + self.interval
                 return True
             return False
@@ -0,0 +1,23 @@
+"""
+文本相似度工具
+基于字符二元组的轻量向量表示，无需额外依赖
+"""
+
+from collections import Counter
+
+
+def bigram_profile(text: str) -> Counter:
+    """文本的字符二元组计数"""
+    return Counter(text[i:i + 2] for i in range(max(len(text) - 1, 1)))
+
+
+def cosine_similarity(a: Counter, b: Counter) -> float:
+    """两个计数向量的余弦相似度"""
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b[key] for key, count in a.items() if key in b)
+    if not dot:
+        return 0.0
+    norm_a = sum(count * count for count in a.values()) ** 0.5
+    norm_b = sum(count * count for count in b.values()) ** 0.5
+    return dot / (norm_a * norm_b)
@@ -3,39 +3,192 @@
 """
 
 import re
-from typing import Dict, Any
+import sys
+import logging
+import threading
+from enum import IntEnum
+from typing import Dict, Any, FrozenSet, List, Optional, Sequence
+
+try:
+    import hyperscan
+except ImportError:  # hyperscan 为可选依赖，缺失时使用预编译正则
+    hyperscan = None
+
+try:
+    import re2
+except ImportError:  # google-re2 为可选依赖，缺失时使用标准库 re
+    re2 = None
+
+logger = logging.getLogger(__name__)
+
+
+class ErrCode(IntEnum):
+    """验证失败的错误码，调用方可按错误码分支而无需解析错误信息"""
+    UNAUTHORIZED = 1
+    INVALID_EMAIL = 2
+    SUBJECT_TOO_LONG = 3
+    BODY_TOO_LONG = 4
+    SENSITIVE_CONTENT = 5
+    ILLEGAL_CHARS = 6
+    EXPRESSION_TOO_LONG = 7
+    INVALID_LOCATION = 8
+    SQL_EMPTY = 9
+    SQL_TOO_LONG = 10
+    SQL_NOT_SELECT = 11
+    SQL_FORBIDDEN = 12
+
+
+def _invalid(code: ErrCode, error: str) -> Dict[str, Any]:
+    """构建验证失败结果"""
+    return {"valid": False, "error": error, "code": code}
+
+
+# 禁止的 SQL 关键词
+_SQL_FORBIDDEN_WORDS = ("INSERT", "UPDATE", "DELETE", "DROP", "CREATE",
+                        "ALTER", "TRUNCATE", "GRANT", "REVOKE", "EXEC")
+
+
+def _compile_scanner(pattern: str):
+    """编译关键词扫描正则：优先使用 RE2（DFA + 字面量前置过滤），未安装或不支持时使用标准库 re"""
+    if re2 is not None:
+        try:
+            return re2.compile(pattern)
+        except re2.error as e:
+            logger.warning("RE2 编译失败，使用标准库 re: %s", e)
+    return re.compile(pattern)
+
+
+# 禁止的 SQL 关键词合并为一个预编译的分支正则（(?i) 忽略大小写），一次扫描完成检查
+_SQL_FORBIDDEN_RE = _compile_scanner(r"(?i)\b(" + "|".join(_SQL_FORBIDDEN_WORDS) + r")\b")
+
+
+def _build_sql_forbidden_db():
+    """把禁止关键词编译为 Hyperscan 多模式数据库，未安装或编译失败时返回 None"""
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        flag = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+        db.compile(
+            expressions=[rf"\b{word}\b".encode("ascii") for word in _SQL_FORBIDDEN_WORDS],
+            ids=list(range(len(_SQL_FORBIDDEN_WORDS))),
+            elements=len(_SQL_FORBIDDEN_WORDS),
+            flags=[flag] * len(_SQL_FORBIDDEN_WORDS),
+        )
+        return db
+    except hyperscan.error as e:
+        logger.warning("Hyperscan 编译失败，使用正则扫描 SQL: %s", e)
+        return None
+
+
+# 每个禁止关键词对应的验证失败结果
+_SQL_FORBIDDEN_RESULTS: Dict[str, Dict[str, Any]] = {
+    word: _invalid(ErrCode.SQL_FORBIDDEN, f"SQL 包含禁止的关键词: {word}") for word in _SQL_FORBIDDEN_WORDS
+}
+
+# Hyperscan 数据库的 scratch 空间不能并发使用，扫描时加锁
+_SQL_FORBIDDEN_DB = _build_sql_forbidden_db()
+_SQL_SCAN_LOCK = threading.Lock()
+
+# 邮箱格式（参数验证与 EmailTool 共用）
+# 域名按“标签.”逐段匹配（标签不含点，避免重叠字符集回溯），\Z 结尾不接受末尾换行
+EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}\Z')
+
+# 计算表达式允许的字符（数字、运算符、括号、空格），按字节删除后仍有剩余即包含非法字符
+_CALC_ALLOWED_BYTES = b"0123456789+-*/%.() "
+
+# 邮件正文敏感词，合并为一个正则一次扫描
+_SENSITIVE_WORDS = ("密码", "银行卡", "身份证")
+_SENSITIVE_RE = _compile_scanner("|".join(map(re.escape, _SENSITIVE_WORDS)))
+
+# 验证结果常量，所有调用共享同一个对象（调用方只读，不要修改）
+_VALID: Dict[str, Any] = {"valid": True, "error": None}
+# 未授权调用不在结果中拼接函数名，需要时由调用方结合函数名格式化（见 LLMClient）
+_UNAUTHORIZED = _invalid(ErrCode.UNAUTHORIZED, "未授权的函数调用")
+_EMAIL_SUBJECT_TOO_LONG = _invalid(ErrCode.SUBJECT_TOO_LONG, "邮件主题过长")
+_EMAIL_BODY_TOO_LONG = _invalid(ErrCode.BODY_TOO_LONG, "邮件正文过长")
+_EMAIL_SENSITIVE = _invalid(ErrCode.SENSITIVE_CONTENT, "内容包含敏感信息")
+_CALC_ILLEGAL_CHARS = _invalid(ErrCode.ILLEGAL_CHARS, "表达式包含非法字符")
+_CALC_TOO_LONG = _invalid(ErrCode.EXPRESSION_TOO_LONG, "表达式过长")
+_WEATHER_BAD_LOCATION = _invalid(ErrCode.INVALID_LOCATION, "无效的城市名称")
+_SQL_EMPTY = _invalid(ErrCode.SQL_EMPTY, "SQL 不能为空")
+_SQL_TOO_LONG = _invalid(ErrCode.SQL_TOO_LONG, "SQL 语句过长")
+_SQL_NOT_SELECT = _invalid(ErrCode.SQL_NOT_SELECT, "只支持 SELECT 查询")
+
+# 已启用工具名称的快照，首次验证时构建
+_ALLOWED_FUNCTIONS: Optional[FrozenSet[str]] = None
+
+
+def _allowed_functions() -> FrozenSet[str]:
+    """获取已启用的工具名称集合（缓存）"""
+    global _ALLOWED_FUNCTIONS
+    if _ALLOWED_FUNCTIONS is None:
+        from tools import get_enabled_tool_names
+        _ALLOWED_FUNCTIONS = frozenset(get_enabled_tool_names())
+    return _ALLOWED_FUNCTIONS
+
+
+def invalidate_validator_cache() -> None:
+    """清除已启用工具名称缓存，注册新工具或修改 enabled 后调用"""
+    global _ALLOWED_FUNCTIONS
+    _ALLOWED_FUNCTIONS = None
+
 
 def validate_tool_call(function_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
     """
     验证工具调用参数
     
     Returns:
-        {"valid": True/False, "error": "错误信息"}
+        {"valid": True/False, "error": "错误信息"}，失败时另含 "code"（ErrCode）
     """
-    # 获取已注册的工具列表
-    from tools import get_enabled_tool_names
-    allowed_functions = get_enabled_tool_names()
+    # 畸形调用（如截断的流式输出）可能给出非字符串名称，直接按未授权处理
+    if not isinstance(function_name, str):
+        return _UNAUTHORIZED
+    # 驻留后与注册表中的名称是同一对象，集合/字典查找走身份比较的快速路径
+    function_name = sys.intern(function_name)
+    if function_name not in _allowed_functions():
+        return _UNAUTHORIZED
     
-    if function_name not in allowed_functions:
-        return {
-            "valid": False,
-            "error": f"未授权的函数调用：{function_name}"
-        }
+    # 特定函数验证（查表分派）
+    validator = _VALIDATORS.get(function_name)
+    return validator(arguments) if validator else _VALID
+
+
+def validate_tool_calls(function_names: Sequence[str],
+                        arguments_list: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    批量验证工具调用参数（日志回放、离线评估等场景）
     
-    # 特定函数验证
-    if function_name == "send_email":
-        return _validate_email_params(arguments)
+    授权集合与分派表只取一次，逐条结果与 validate_tool_call 相同
     
-    if function_name == "calculate":
-        return _validate_calculate_params(arguments)
+    Args:
+        function_names: 函数名列表
+        arguments_list: 与函数名一一对应的参数列表
     
-    if function_name == "get_weather":
-        return _validate_weather_params(arguments)
+    Returns:
+        验证结果列表，顺序与输入一致
     
-    if function_name == "execute_sql":
-        return _validate_sql_params(arguments)
+    Raises:
+        ValueError: 两个列表长度不一致
+    """
+    if len(function_names) != len(arguments_list):
+        raise ValueError("函数名与参数列表长度不一致")
     
-    return {"valid": True, "error": None}
+    allowed = _allowed_functions()
+    get_validator = _VALIDATORS.get
+    results = []
+    append = results.append
+    for function_name, arguments in zip(function_names, arguments_list):
+        if not isinstance(function_name, str):
+            append(_UNAUTHORIZED)
+            continue
+        function_name = sys.intern(function_name)
+        if function_name not in allowed:
+            append(_UNAUTHORIZED)
+            continue
+        validator = get_validator(function_name)
+        append(validator(arguments) if validator else _VALID)
+    return results
 
 
 def _validate_email_params(args: Dict[str, Any]) -> Dict[str, Any]:
@@ -44,26 +197,23 @@ def _validate_email_params(args: Dict[str, Any]) -> Dict[str, Any]:
     subject = args.get("subject", "")
     body = args.get("body", "")
     
-    # 邮箱格式验证
-    email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(email_pattern, to):
-        return {"valid": False, "error": f"无效的邮箱地址：{to}"}
+    # 邮箱格式验证（先做长度与 @ 的廉价检查，再交给正则）
+    if len(to) > 254 or "@" not in to or not EMAIL_RE.match(to):
+        return _invalid(ErrCode.INVALID_EMAIL, f"无效的邮箱地址：{to}")
     
     # 主题长度
     if len(subject) > 100:
-        return {"valid": False, "error": "邮件主题过长"}
+        return _EMAIL_SUBJECT_TOO_LONG
     
     # 正文长度
     if len(body) > 50000:
-        return {"valid": False, "error": "邮件正文过长"}
+        return _EMAIL_BODY_TOO_LONG
     
     # 敏感词检查
-    sensitive_words = ["密码", "银行卡", "身份证"]
-    for word in sensitive_words:
-        if word in body:
-            return {"valid": False, "error": "内容包含敏感信息"}
+    if _SENSITIVE_RE.search(body):
+        return _EMAIL_SENSITIVE
     
-    return {"valid": True, "error": None}
+    return _VALID
 
 
 def _validate_calculate_params(args: Dict[str, Any]) -> Dict[str, Any]:
@@ -71,15 +221,15 @@ def _validate_calculate_params(args: Dict[str, Any]) -> Dict[str, Any]:
     expression = args.get("expression", "")
     
     # 只允许数字和运算符
-    allowed_chars = set("0123456789+-*/%.() ")
-    if not all(c in allowed_chars for c in expression):
-        return {"valid": False, "error": "表达式包含非法字符"}
+    # 非 ASCII 直接拒绝；ASCII 串编码为 bytes 后用 bytes.translate 一次删除允许字符
+    if not expression.isascii() or expression.encode("ascii").translate(None, _CALC_ALLOWED_BYTES):
+        return _CALC_ILLEGAL_CHARS
     
     # 长度限制
     if len(expression) > 1000:
-        return {"valid": False, "error": "表达式过长"}
+        return _CALC_TOO_LONG
     
-    return {"valid": True, "error": None}
+    return _VALID
 
 
 def _validate_weather_params(args: Dict[str, Any]) -> Dict[str, Any]:
@@ -87,33 +237,59 @@ def _validate_weather_params(args: Dict[str, Any]) -> Dict[str, Any]:
     location = args.get("location", "")
     
     if not location or len(location) > 50:
-        return {"valid": False, "error": "无效的城市名称"}
+        return _WEATHER_BAD_LOCATION
     
-    return {"valid": True, "error": None}
+    return _VALID
 
 
 def _validate_sql_params(args: Dict[str, Any]) -> Dict[str, Any]:
     """验证 SQL 查询参数"""
-    import re
-    
     sql = args.get("sql", "")
     
     if not sql:
-        return {"valid": False, "error": "SQL 不能为空"}
+        return _SQL_EMPTY
     
     # 长度限制
     if len(sql) > 5000:
-        return {"valid": False, "error": "SQL 语句过长"}
+        return _SQL_TOO_LONG
+    
+    # 确保是 SELECT（只对开头 6 个字符转大写，先于正则扫描）
+    if sql.lstrip()[:6].upper() != "SELECT":
+        return _SQL_NOT_SELECT
+    
+    # 检查是否包含禁止的关键词（忽略大小写直接扫描原文，不生成大写副本）
+    keyword = _find_forbidden_sql(sql)
+    if keyword:
+        return _SQL_FORBIDDEN_RESULTS[keyword]
+    
+    return _VALID
+
+
+
+def _find_forbidden_sql(sql: str) -> Optional[str]:
+    """返回 SQL 中第一个禁止的关键词（大写），没有则返回 None"""
+    if _SQL_FORBIDDEN_DB is None:
+        match = _SQL_FORBIDDEN_RE.search(sql)
+        return match.group(1).upper() if match else None
     
-    # 检查是否包含禁止的关键词
-    forbidden = ["INSERT", "UPDATE", "DELETE", "DROP", "CREATE", "ALTER", "TRUNCATE", "GRANT", "REVOKE", "EXEC"]
-    sql_upper = sql.upper()
-    for word in forbidden:
-        if re.search(r'\b' + word + r'\b', sql_upper):
-            return {"valid": False, "error": f"SQL 包含禁止的关键词: {word}"}
+    hits: List[int] = []
     
-    # 确保是 SELECT
-    if not sql_upper.strip().startswith("SELECT"):
-        return {"valid": False, "error": "只支持 SELECT 查询"}
+    def on_match(pattern_id, start, end, flags, context):
+        hits.append(pattern_id)
+        return True  # 命中第一个即终止扫描
     
-    return {"valid": True, "error": None}
+    with _SQL_SCAN_LOCK:
+        try:
+            _SQL_FORBIDDEN_DB.scan(sql.encode("utf-8", "replace"), match_event_handler=on_match)
+        except hyperscan.ScanTerminated:
+            pass
+    return _SQL_FORBIDDEN_WORDS[hits[0]] if hits else None
+
+
+# 函数名 → 参数验证器，未列出的函数只做授权检查
+_VALIDATORS = {
+    "send_email": _validate_email_params,
+    "calculate": _validate_calculate_params,
+    "get_weather": _validate_weather_params,
+    "execute_sql": _validate_sql_params,
+}